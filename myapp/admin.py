@@ -1,5 +1,13 @@
 from django.contrib import admin
-from .models import Mood
+from .models import (
+    DailyWisdom, GenerationJob, MonthlyReport, Mood, MoodDailyRollup, MoodTypeCounter, Suggestion,
+)
 
 # Register your models here.
-admin.site.register(Mood)
\ No newline at end of file
+admin.site.register(Mood)
+admin.site.register(Suggestion)
+admin.site.register(GenerationJob)
+admin.site.register(DailyWisdom)
+admin.site.register(MoodDailyRollup)
+admin.site.register(MoodTypeCounter)
+admin.site.register(MonthlyReport)
\ No newline at end of file
@@ -3,3 +3,17 @@ from django.apps import AppConfig
 
 class MyappConfig(AppConfig):
     name = 'myapp'
+
+    def ready(self):
+        # Register the Mood signal handlers (rollup maintenance)
+        from . import signals  # noqa: F401
+
+        # Per-request SQL / LLM / template timing (RequestTimingMiddleware)
+        from django.conf import settings
+        if settings.REQUEST_TIMING_ENABLED:
+            from . import instrumentation
+            instrumentation.install()
+
+        # Multi-process /metrics: this process's snapshots go to METRICS_DIR
+        from . import metrics
+        metrics.start_flusher()
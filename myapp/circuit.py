@@ -0,0 +1,83 @@
+"""
+Circuit breaker for calls to an unreliable dependency (Gemini).
+
+After `failure_threshold` consecutive failures the circuit opens and every
+call is refused immediately, so views render their fallbacks instead of
+waiting for a timeout. Once `reset_timeout` seconds have passed, a single
+probe call is let through (half-open): success closes the circuit, failure
+opens it again. Only that probe can close an open circuit; a call that
+started before the trip and succeeds late doesn't.
+"""
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self):
+        """True if a call may go ahead now; refused calls are counted"""
+        with self._lock:
+            if self.state == OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == OPEN:
+                return
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == OPEN:
+                # A late result of a call made before the trip; don't push the reset back
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self.opened_at = self._clock()
+                self._probing = False
+
+    def record_skipped(self):
+        """An allowed call never reached the dependency; a half-open probe may be tried again"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'open_for': round(self._clock() - self.opened_at, 1) if self.state == OPEN else None,
+            }
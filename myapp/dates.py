@@ -0,0 +1,26 @@
+"""
+Calendar ranges as half-open [start, end) datetime pairs.
+
+Filtering with created_at__gte=start, created_at__lt=end lets the database
+walk the (user, created_at) index, where created_at__month/__year make it
+evaluate a date function on every row.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_bounds(day):
+    """[start, end) datetimes of a local calendar day"""
+    return _start_of(day), _start_of(day + timedelta(days=1))
+
+
+def month_bounds(day=None):
+    """[start, end) datetimes of the local calendar month containing `day` (default: today)"""
+    first = (day or timezone.localdate()).replace(day=1)
+    next_first = (first + timedelta(days=32)).replace(day=1)
+    return _start_of(first), _start_of(next_first)
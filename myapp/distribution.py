@@ -0,0 +1,68 @@
+"""
+Mood distributions: one user's histogram and the site-wide one.
+
+A user's histogram sums their daily rollups. The site-wide histogram reads
+MoodTypeCounter, one row per mood type that the Mood signals bump on every
+create, type change and delete, so it never scans Mood.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from . import rollups
+from .models import Mood, MoodTypeCounter
+
+LABELS = dict(Mood.MOOD_CHOICES)
+
+
+def histogram(counts):
+    """[{'mood_type', 'label', 'count', 'percent'}, ...] in MOOD_CHOICES order, plus the total"""
+    total = sum(counts.get(mood_type, 0) for mood_type in rollups.MOOD_TYPES)
+    rows = [
+        {
+            'mood_type': mood_type,
+            'label': LABELS[mood_type],
+            'count': counts.get(mood_type, 0),
+            'percent': round(counts.get(mood_type, 0) / total * 100) if total else 0,
+        }
+        for mood_type in rollups.MOOD_TYPES
+    ]
+    return rows, total
+
+
+def for_user(user):
+    return histogram(rollups.totals(user))
+
+
+def site_wide():
+    return histogram(dict(MoodTypeCounter.objects.values_list('mood_type', 'count')))
+
+
+def adjust(mood_type, delta):
+    """Add `delta` (may be negative) to a mood type's site-wide counter"""
+    if mood_type not in LABELS:
+        return
+    counter = MoodTypeCounter.objects.filter(mood_type=mood_type)
+    if delta < 0:
+        # Never below zero, even if the counters were never backfilled
+        counter.filter(count__gte=-delta).update(count=F('count') + delta)
+        return
+    # Write first, no read; runs inside the Mood save's transaction (Mood.save)
+    if counter.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            MoodTypeCounter.objects.create(mood_type=mood_type, count=delta)
+    except IntegrityError:
+        counter.update(count=F('count') + delta)
+
+
+def rebuild():
+    """Recount every site-wide counter with one GROUP BY over Mood"""
+    counts = dict(
+        Mood.objects.values('mood_type').annotate(n=Count('id')).order_by().values_list('mood_type', 'n')
+    )
+    with transaction.atomic():
+        for mood_type in LABELS:
+            MoodTypeCounter.objects.update_or_create(
+                mood_type=mood_type, defaults={'count': counts.get(mood_type, 0)}
+            )
@@ -0,0 +1,44 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling.
+
+Picks `threshold` points out of a long series so that a chart drawn from them
+keeps the original's peaks and dips, which plain every-nth sampling loses.
+"""
+
+
+def lttb(points, threshold):
+    """Indices of the points to keep; `points` is a list of (x, y) sorted by x"""
+    count = len(points)
+    if threshold >= count:
+        return list(range(count))
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points")
+
+    kept = [0]
+    # Everything between the first and last point is split into threshold - 2 buckets
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # The average of the next bucket is the third corner of the triangle
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        next_points = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(x for x, _ in next_points) / len(next_points)
+        avg_y = sum(y for _, y in next_points) / len(next_points)
+
+        px, py = points[previous]
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((px - avg_x) * (y - py) - (px - x) * (avg_y - py))
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(best)
+        previous = best
+
+    kept.append(count - 1)
+    return kept
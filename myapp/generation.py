@@ -0,0 +1,416 @@
+"""
+Prompt builders and generators shared by the views and the background worker.
+
+Each generator returns parsed, ready-to-render content (or raises
+llm.LLMError), so a view and a queued job produce the same result.
+"""
+import json
+
+from django.utils import timezone
+
+from . import llm, llm_cache
+from .models import Mood, Suggestion
+
+
+def wisdom_prompt(username, mood_type):
+    return f"""
+You are a compassionate wellness guide. Generate a short, calming, and encouraging quote for {username} who is feeling {mood_type} today.
+
+Requirements:
+- 1–2 lines only
+- Calm and soothing tone
+- Encouraging and uplifting
+- Mental-health friendly
+- Do NOT include any explanations or extra text, just the quote itself
+
+Example tone: "Even on quiet days, your strength is growing."
+
+Generate only the quote:
+"""
+
+
+def generate_wisdom(username, mood_type, timeout=None):
+    """
+    Daily quote for a user's mood; the same user + mood shares one quote until the cache entry expires.
+
+    `timeout` overrides the interactive 'wisdom' latency budget, e.g. for the nightly batch.
+    """
+    return llm_cache.get_cache().get_or_generate(
+        'wisdom',
+        lambda: llm.generate('wisdom', wisdom_prompt(username, mood_type), timeout=timeout).strip(),
+        mood_type=mood_type,
+        username=username,
+    )
+
+
+async def agenerate_wisdom(username, mood_type):
+    """Async version of generate_wisdom(), sharing the same cache entries"""
+    async def produce():
+        return (await llm.agenerate('wisdom', wisdom_prompt(username, mood_type))).strip()
+
+    return await llm_cache.get_cache().aget_or_generate(
+        'wisdom', produce, mood_type=mood_type, username=username,
+    )
+
+
+def suggestion_prompt(mood):
+    return f"""
+        The user is feeling {mood.mood_type}.
+        Their journal note is: "{mood.note}"
+
+        Give a short, kind, emotionally supportive suggestion,
+        exercises both physical and mental.
+        Keep it calm, pastel, friendly, and comforting.
+        Give little medical advice. Use some emojis.
+        """
+
+
+def generate_suggestion(mood):
+    """Generate the suggestion for a mood and save it (replacing a stale one); returns the text"""
+    text = llm.generate('suggestion', suggestion_prompt(mood))
+    if text:
+        Suggestion.objects.update_or_create(mood=mood, defaults={'text': text, 'stale': False})
+    return text
+
+
+def playlist_prompt(mood_type, note):
+    return f"""You are a music recommendation expert. Based on the user's current mood ({mood_type}),
+        generate a brief playlist description (2-3 sentences) that explains why these songs would help them feel better.
+
+        Make it warm, supportive, and encouraging. Focus on the emotional and therapeutic benefits of music.
+
+        User's note: {note if note else 'No specific note provided'}
+
+        Generate just the description, no songs list."""
+
+
+def playlist_description(mood_type, note):
+    """Short AI description for the personalized playlist, cached per mood and note"""
+    return llm_cache.get_cache().get_or_generate(
+        'playlist',
+        lambda: llm.generate('playlist', playlist_prompt(mood_type, note)).strip(),
+        mood_type=mood_type,
+        note=note,
+    )
+
+
+async def aplaylist_description(mood_type, note):
+    """Async version of playlist_description()"""
+    async def produce():
+        return (await llm.agenerate('playlist', playlist_prompt(mood_type, note))).strip()
+
+    return await llm_cache.get_cache().aget_or_generate(
+        'playlist', produce, mood_type=mood_type, note=note,
+    )
+
+
+def recent_mood_types(user, limit=7):
+    """Comma separated mood types of the user's latest entries, as used by the challenges prompt"""
+    recent = Mood.objects.filter(user=user).order_by('-created_at').values_list('mood_type', flat=True)[:limit]
+    return ", ".join(recent)
+
+
+def challenges_prompt(mood_text):
+    return f"""You are a compassionate wellness coach. Based on the user's recent moods ({mood_text}),
+            generate EXACTLY 3 personalized mindful challenges to help them.
+
+            For EACH challenge, provide ONLY:
+            emoji: (one appropriate emoji)
+            title: (short, 2-3 words)
+            description: (one short, encouraging sentence)
+
+            Format your response EXACTLY like this (3 times):
+            emoji: 🧘
+            title: Challenge Title
+            description: A short encouraging description.
+
+            Generate 3 personalized challenges now, considering their recent emotional state. Keep it simple and supportive."""
+
+
+def parse_challenges(ai_output):
+    """Parse 'emoji: / title: / description:' blocks into challenge dictionaries"""
+    challenges = []
+    current_challenge = {}
+
+    for line in ai_output.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('emoji:'):
+            if current_challenge:
+                challenges.append(current_challenge)
+            current_challenge = {'emoji': line.replace('emoji:', '').strip()}
+        elif line.startswith('title:'):
+            current_challenge['title'] = line.replace('title:', '').strip()
+        elif line.startswith('description:'):
+            current_challenge['description'] = line.replace('description:', '').strip()
+
+    # Add the last challenge
+    if current_challenge and 'emoji' in current_challenge:
+        challenges.append(current_challenge)
+
+    return challenges
+
+
+def generate_challenges(mood_text):
+    """Three personalized challenges for the given recent moods, or None if the output didn't parse"""
+    ai_output = llm_cache.get_cache().get_or_generate(
+        'challenges',
+        lambda: llm.generate('challenges', challenges_prompt(mood_text)).strip(),
+        mood_type=mood_text,
+    )
+    challenges = parse_challenges(ai_output or '')
+    if len(challenges) >= 3:
+        return challenges[:3]
+    return None
+
+
+async def agenerate_challenges(mood_text):
+    """Async version of generate_challenges()"""
+    async def produce():
+        return (await llm.agenerate('challenges', challenges_prompt(mood_text))).strip()
+
+    ai_output = await llm_cache.get_cache().aget_or_generate('challenges', produce, mood_type=mood_text)
+    challenges = parse_challenges(ai_output or '')
+    if len(challenges) >= 3:
+        return challenges[:3]
+    return None
+
+
+def bundle_prompt(username, recent_moods):
+    latest = recent_moods[0]
+    mood_text = ", ".join(m['mood_type'] for m in recent_moods)
+    note = latest['note'] or 'No specific note provided'
+
+    return f"""You are a compassionate wellness guide and music therapy expert for {username}.
+
+Their most recent mood is {latest['mood_type']}. Their recent moods (newest first): {mood_text}.
+Their latest journal note: "{note}"
+
+Respond with ONLY a JSON object with exactly these keys:
+{{
+  "wisdom": "A short, calming, encouraging quote for them (1-2 lines, mental-health friendly, no explanations)",
+  "challenges": [
+    {{"emoji": "one appropriate emoji", "title": "short, 2-3 words", "description": "one short, encouraging sentence"}}
+  ],
+  "playlist_description": "2-3 warm sentences on why music for their current mood would help them feel better"
+}}
+
+"challenges" must contain EXACTLY 3 personalized mindful challenges that consider their recent emotional state.
+Keep everything warm, supportive and gentle."""
+
+
+def parse_bundle(text):
+    """Validate the daily bundle JSON; raises ValueError if anything is missing"""
+    text = text.strip()
+    if text.startswith("```"):
+        # Tolerate a markdown code fence around the JSON
+        text = text.strip("`")
+        text = text[text.index("{"):]
+    data = json.loads(text)
+
+    wisdom = str(data.get('wisdom') or '').strip()
+    playlist = str(data.get('playlist_description') or '').strip()
+    challenges = [
+        {key: str(c[key]).strip() for key in ('emoji', 'title', 'description')}
+        for c in data.get('challenges') or []
+        if isinstance(c, dict) and all(c.get(key) for key in ('emoji', 'title', 'description'))
+    ]
+    if not wisdom or not playlist or len(challenges) < 3:
+        raise ValueError("incomplete daily bundle")
+
+    return {
+        'wisdom': wisdom,
+        'challenges': challenges[:3],
+        'playlist_description': playlist,
+    }
+
+
+def daily_bundle(user):
+    """
+    Wisdom, challenges and playlist description for today from ONE structured call.
+
+    Cached per user per day (and per recent-mood signature, so a new entry gets
+    fresh content). Returns None when the user has no moods yet or the answer
+    didn't parse, in which case the views fall back to their own prompts.
+    An answer that didn't parse is cached too, so it isn't asked for again that day.
+    """
+    recent_moods = list(
+        Mood.objects.filter(user=user).order_by('-created_at').values('mood_type', 'note')[:7]
+    )
+    if not recent_moods:
+        return None
+
+    def produce():
+        text = llm.generate('daily_bundle', bundle_prompt(user.username, recent_moods), json_mode=True)
+        try:
+            return json.dumps(parse_bundle(text))
+        except ValueError:
+            # Cached as "null": the views use their own prompts for the rest of the day
+            return json.dumps(None)
+
+    cached = llm_cache.get_cache().get_or_generate(
+        'daily_bundle',
+        produce,
+        mood_type=", ".join(m['mood_type'] for m in recent_moods),
+        note=recent_moods[0]['note'],
+        username=user.username,
+        extra=timezone.localdate().isoformat(),
+    )
+    return json.loads(cached) if cached else None
+
+
+def monthly_prompt(mood_text):
+    """Monthly analysis prompt around the month's entries (or weekly summaries, see summarize.digest)"""
+    return f"""
+You are a gentle and emotionally intelligent mental wellness assistant.
+
+Based on the user's moods for this month below:
+{mood_text}
+
+Respond in the following STRUCTURED FORMAT ONLY:
+
+Mood Overview:
+(2–3 lines summarizing overall emotional state)
+
+Patterns Observed:
+- Pattern 1
+- Pattern 2
+- Pattern 3
+
+Emotional Insight:
+(A deeper reflection about emotional health)
+
+Gentle Suggestions:
+- Suggestion 1
+- Suggestion 2
+- Suggestion 3
+
+Tone: warm, supportive, non-judgmental.
+Do NOT add anything outside this structure.
+"""
+
+
+def wellness_prompt(mood_text):
+    return f"""You are a gentle and emotionally intelligent mental wellness assistant.
+
+Based on the user's mood entries for this month:
+{mood_text}
+
+Provide a comprehensive wellness analysis in the following STRUCTURED FORMAT ONLY:
+
+EMOTIONAL SUMMARY:
+(2-3 lines describing the overall emotional state)
+
+MOOD PATTERNS:
+(2-3 lines about observed patterns in moods)
+
+EMOTIONAL INSIGHT:
+(2-3 lines of deeper reflection about emotional health)
+
+GENTLE SUGGESTIONS:
+(3-4 lines of supportive, actionable suggestions)
+
+Tone: warm, supportive, non-clinical, gentle, encouraging.
+Do NOT include section labels in your output - just provide the content under each section naturally.
+Do NOT add markdown formatting."""
+
+
+def parse_wellness_analysis(ai_output):
+    """Split the wellness analysis into summary/patterns/insight/suggestions text ('' when missing)"""
+    current_section = None
+    sections = {
+        'summary': [],
+        'patterns': [],
+        'insight': [],
+        'suggestions': []
+    }
+
+    for line in ai_output.split('\n'):
+        line_lower = line.lower().strip()
+
+        if 'emotional summary' in line_lower:
+            current_section = 'summary'
+            continue
+        elif 'mood patterns' in line_lower:
+            current_section = 'patterns'
+            continue
+        elif 'emotional insight' in line_lower:
+            current_section = 'insight'
+            continue
+        elif 'gentle suggestions' in line_lower or 'suggestions' in line_lower:
+            current_section = 'suggestions'
+            continue
+
+        if line.strip() and current_section:
+            sections[current_section].append(line.strip())
+
+    return {section: ' '.join(lines) for section, lines in sections.items()}
+
+
+class MonthlyAnalysisParser:
+    """
+    Incremental parser for the monthly analysis format.
+
+    feed() takes raw chunks as they stream in and returns (section, value)
+    events for every line completed so far; close() flushes the last line.
+    The parsed result accumulates in .sections.
+    """
+
+    HEADINGS = [
+        ("Mood Overview", "overview"),
+        ("Patterns Observed", "patterns"),
+        ("Emotional Insight", "insight"),
+        ("Gentle Suggestions", "suggestions"),
+    ]
+
+    def __init__(self):
+        self.sections = {
+            "overview": "",
+            "patterns": [],
+            "insight": "",
+            "suggestions": []
+        }
+        self._current = None
+        self._buffer = ""
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        events = []
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            events.extend(self._parse_line(line))
+        return events
+
+    def close(self):
+        line, self._buffer = self._buffer, ""
+        return self._parse_line(line)
+
+    def _parse_line(self, line):
+        line = line.strip()
+
+        for heading, section in self.HEADINGS:
+            if line.startswith(heading):
+                self._current = section
+                return []
+
+        current = self._current
+        if current in ("overview", "insight"):
+            if not line:
+                return []
+            self.sections[current] += line + " "
+            return [(current, line)]
+        if current in ("patterns", "suggestions") and line.startswith("-"):
+            item = line[1:].strip()
+            self.sections[current].append(item)
+            return [(current, item)]
+        return []
+
+
+def parse_monthly_analysis(text):
+    """Split a complete monthly analysis response into its sections"""
+    parser = MonthlyAnalysisParser()
+    parser.feed(text)
+    parser.close()
+    return parser.sections
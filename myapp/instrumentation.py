@@ -0,0 +1,218 @@
+"""
+Per-request timing of SQL, LLM calls and template rendering.
+
+RequestTimingMiddleware gives each sampled request a RequestTimings in a
+context variable and, for as long as the view runs, an execute wrapper on
+the request thread's database connections. An llm observer (set up by
+install()) and the TimedDjangoTemplates backend add the LLM and template
+time to it. The totals go out as a Server-Timing header (shown in the
+browser's network panel) and one JSON line on the 'myapp.timing' logger.
+Requests that run more queries than their budget are logged as warnings.
+
+Work done while a streaming response is being sent (the SSE views) happens
+after the middleware has returned, so only the view's setup is counted.
+Queries made from other threads the view starts aren't counted either.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import llm, metrics
+
+logger = logging.getLogger('myapp.timing')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Totals for one request; threads and tasks working for it add to the same object"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.llm_calls = 0
+        # Summed over calls, so concurrent calls can add up to more than the request took
+        self.llm_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = False
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds):
+        with self._lock:
+            self.db_queries += 1
+            self.db_seconds += seconds
+
+    def add_llm_call(self, seconds):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+
+def _time_query(timings, execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - started)
+
+
+def _wrap_queries(timings):
+    """Time this thread's queries on every database until the returned stack is closed"""
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(partial(_time_query, timings)))
+    return stack
+
+
+def _record_llm_call(feature, seconds):
+    timings = _current.get()
+    if timings is not None:
+        timings.add_llm_call(seconds)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        # A template tag rendering another template from inside a render is counted once
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+        timings.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_seconds += time.perf_counter() - started
+            timings.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with renders counted in the request's template time (see TEMPLATES)"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+_installed = False
+
+
+def install():
+    """Set up the llm observer; called from MyappConfig.ready() when REQUEST_TIMING_ENABLED"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    llm.add_observer(_record_llm_call)
+
+
+def query_budget(url_name):
+    return settings.REQUEST_QUERY_BUDGETS.get(url_name, settings.REQUEST_QUERY_BUDGET)
+
+
+class RequestTimingMiddleware:
+    """Server-Timing header and a timing log line for a sample of requests; the /metrics latency histogram for all"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        timings = self._sample()
+        if timings is None:
+            response = self.get_response(request)
+        else:
+            token = _current.set(timings)
+            try:
+                with _wrap_queries(timings):
+                    response = self.get_response(request)
+            finally:
+                _current.reset(token)
+            self._report(request, response, timings)
+        self._observe(request, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        timings = self._sample()
+        if timings is None:
+            response = await self.get_response(request)
+        else:
+            token = _current.set(timings)
+            try:
+                # Connections belong to threads: wrap the ones of the thread this request's sync code runs in
+                queries = await sync_to_async(_wrap_queries)(timings)
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    await sync_to_async(queries.close)()
+            finally:
+                _current.reset(token)
+            self._report(request, response, timings)
+        self._observe(request, started)
+        return response
+
+    def _sample(self):
+        if not settings.REQUEST_TIMING_ENABLED:
+            return None
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return None
+        return RequestTimings()
+
+    def _observe(self, request, started):
+        # Every request, sampled or not, goes into the /metrics latency histogram
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        metrics.REQUEST_DURATION.observe(time.perf_counter() - started, view)
+
+    def _report(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        match = request.resolver_match
+        route = match.url_name if match else None
+        budget = query_budget(route)
+        over_budget = budget is not None and timings.db_queries > budget
+
+        response.headers['Server-Timing'] = ", ".join([
+            f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_queries} queries"',
+            f'llm;dur={timings.llm_seconds * 1000:.1f};desc="{timings.llm_calls} calls"',
+            f'tpl;dur={timings.template_seconds * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_queries': timings.db_queries,
+            'db_ms': round(timings.db_seconds * 1000, 1),
+            'llm_calls': timings.llm_calls,
+            'llm_ms': round(timings.llm_seconds * 1000, 1),
+            'template_ms': round(timings.template_seconds * 1000, 1),
+            'query_budget': budget,
+            'over_query_budget': over_budget,
+        }
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
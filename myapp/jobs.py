@@ -0,0 +1,121 @@
+"""
+DB-backed queue for LLM work triggered by saving a Mood.
+
+mood_entry and reflection enqueue GenerationJob rows instead of waiting on
+Gemini. `manage.py run_generation_worker` claims and runs them. Claiming is a
+conditional UPDATE, so several workers can share the table safely on SQLite.
+run_job() only makes the LLM call, so it can run on a pool thread; the
+worker's main thread saves the results with finish_job(), the same split as
+generate_daily_wisdom, so SQLite never sees the pool's threads competing to write.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import generation, llm
+from .models import GenerationJob, Suggestion
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_for_mood(mood, kinds=None):
+    """Queue the configured generation kinds for a freshly saved mood"""
+    kinds = settings.GENERATION_JOB_KINDS if kinds is None else kinds
+    return GenerationJob.objects.bulk_create([
+        GenerationJob(mood=mood, kind=kind) for kind in kinds
+    ])
+
+
+def is_stale(job):
+    return job.updated_at < timezone.now() - timedelta(seconds=settings.GENERATION_JOB_STALE_SECONDS)
+
+
+def requeue_stale():
+    """Put jobs left 'running' by a dead worker back in the queue"""
+    cutoff = timezone.now() - timedelta(seconds=settings.GENERATION_JOB_STALE_SECONDS)
+    return GenerationJob.objects.filter(status="running", updated_at__lt=cutoff).update(
+        status="pending", updated_at=timezone.now()
+    )
+
+
+def claim(limit):
+    """Mark up to `limit` pending jobs as running and return the ones this worker won"""
+    candidates = list(
+        GenerationJob.objects.filter(status="pending", run_after__lte=timezone.now())
+        .order_by('created_at')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        won = GenerationJob.objects.filter(id=job_id, status="pending").update(
+            status="running", attempts=F('attempts') + 1, updated_at=timezone.now()
+        )
+        if won:
+            claimed.append(job_id)
+    return list(GenerationJob.objects.filter(id__in=claimed).select_related('mood', 'mood__user'))
+
+
+def run_job(job):
+    """Make one claimed job's LLM call without writing to the database; returns the suggestion text, if any"""
+    close_old_connections()
+    try:
+        mood = job.mood
+        if job.kind == "suggestion":
+            return llm.generate('suggestion', generation.suggestion_prompt(mood))
+        elif job.kind == "playlist":
+            generation.playlist_description(mood.mood_type, mood.note)
+        elif job.kind == "challenges":
+            generation.generate_challenges(generation.recent_mood_types(mood.user))
+        else:
+            raise ValueError(f"Unknown generation job kind: {job.kind}")
+        return None
+    finally:
+        close_old_connections()
+
+
+def finish_job(job, text=None, error=None):
+    """Save a job's result (or requeue / fail it after `error`); returns True on success"""
+    if error is not None:
+        logger.warning("Generation job %s failed (attempt %s): %s", job.id, job.attempts, error)
+        retry = job.attempts < settings.GENERATION_JOB_MAX_ATTEMPTS
+        # Back off exponentially so a failing provider isn't retried in a tight loop
+        delay = settings.GENERATION_JOB_RETRY_SECONDS * 2 ** max(job.attempts - 1, 0)
+        now = timezone.now()
+        GenerationJob.objects.filter(id=job.id).update(
+            status="pending" if retry else "failed",
+            error=str(error)[:1000],
+            run_after=now + timedelta(seconds=delay),
+            updated_at=now,
+        )
+        return False
+
+    if job.kind == "suggestion" and text:
+        Suggestion.objects.update_or_create(mood=job.mood, defaults={'text': text, 'stale': False})
+    GenerationJob.objects.filter(id=job.id).update(
+        status="done", error="", updated_at=timezone.now()
+    )
+    return True
+
+
+def latest_suggestion_job(mood):
+    return (
+        GenerationJob.objects.filter(mood=mood, kind="suggestion")
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def pending_suggestion_job(mood):
+    """The queued suggestion job the page should wait for, or None to generate inline"""
+    job = latest_suggestion_job(mood)
+    if job is None or job.status not in ("pending", "running"):
+        return None
+    # Nobody picked it up (no worker running?) - don't leave the user waiting forever
+    if is_stale(job):
+        return None
+    return job
+
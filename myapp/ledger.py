@@ -0,0 +1,117 @@
+"""
+Append-only ledger of LLM calls, for capacity planning and cost analysis.
+
+Every generate/stream call (llm.py), every answer served from the response
+cache or a saved monthly report, and every page that fell back to canned
+content adds one JSON line to LLM_LEDGER_PATH:
+
+    {"ts": 1760601600.123, "feature": "wisdom", "outcome": "ok", "cache": "miss",
+     "prompt_chars": 812, "output_chars": 164, "ms": 1432.5}
+
+outcome is ok, error (with "error": the exception class) or fallback;
+cache is hit, miss (the call filled the cache), coalesced (it shared an
+identical call already in flight, so no model call of its own) or null.
+record() only appends to an in-memory buffer, so request threads never wait
+on the disk; a background thread writes the buffer out every
+LLM_LEDGER_FLUSH_SECONDS and at exit. If the buffer fills up (the disk is
+stuck) the oldest records are dropped. Each flush is a single append, so
+several processes can share one file. `manage.py llm_ledger_report`
+summarizes it.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Set by llm_cache while it calls a producer, so the call is logged as a cache miss
+cache_status = ContextVar('llm_cache_status', default=None)
+
+_buffer = deque()
+_dropped = 0
+_flusher = None
+_flusher_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def record(feature, outcome, prompt_chars=None, output_chars=None, seconds=None, cache=None, error=None):
+    global _dropped
+    if not settings.LLM_LEDGER_PATH:
+        return
+    if _flusher is None:
+        _start_flusher()
+
+    entry = {
+        'ts': round(time.time(), 3),
+        'feature': feature,
+        'outcome': outcome,
+        'cache': cache if cache is not None else cache_status.get(),
+        'prompt_chars': prompt_chars,
+        'output_chars': output_chars,
+        'ms': round(seconds * 1000, 1) if seconds is not None else None,
+    }
+    if error:
+        entry['error'] = error
+    if len(_buffer) >= settings.LLM_LEDGER_BUFFER:
+        try:
+            _buffer.popleft()
+            _dropped += 1
+        except IndexError:
+            pass  # flushed in the meantime
+    _buffer.append(entry)
+
+
+def flush():
+    """Write out everything buffered so far; returns the number of records written"""
+    global _dropped
+    with _write_lock:
+        entries = []
+        while _buffer:
+            entries.append(_buffer.popleft())
+        if _dropped:
+            entries.append({'ts': round(time.time(), 3), 'dropped': _dropped})
+            _dropped = 0
+        if not entries:
+            return 0
+
+        path = settings.LLM_LEDGER_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = "".join(json.dumps(entry, separators=(',', ':')) + "\n" for entry in entries)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(data)
+        return len(entries)
+
+
+def _start_flusher():
+    global _flusher
+    with _flusher_lock:
+        if _flusher is not None:
+            return
+
+        def flush_forever():
+            while True:
+                time.sleep(settings.LLM_LEDGER_FLUSH_SECONDS)
+                try:
+                    flush()
+                except OSError:
+                    pass
+
+        _flusher = threading.Thread(target=flush_forever, name='llm-ledger-flusher', daemon=True)
+        _flusher.start()
+        atexit.register(flush)
+
+
+def read(path):
+    """Yield the ledger's records, skipping the dropped-records markers and torn lines"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if 'feature' in entry:
+                yield entry
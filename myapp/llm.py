@@ -0,0 +1,300 @@
+"""
+Process-wide gateway for every LLM call made by MoodMirror.
+
+The model backend (Gemini, or the local fake) comes from LLM_PROVIDER, see
+providers.py, and is built once and reused across requests. Every call gets a deadline (the feature's latency budget) and has to
+take a slot from a global concurrency limit, so a slow response can't hold
+every worker hostage. A circuit breaker refuses calls outright while the model
+keeps failing, so views go straight to their fallbacks.
+Views use generate()/stream() and async code (ASGI views) uses
+agenerate()/astream(). Observers registered with add_observer() hear how
+long each of those calls took (see instrumentation.py), and every call is
+counted in /metrics (metrics.py) and written to the call ledger (ledger.py).
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import ledger, metrics, providers, singleflight
+from .circuit import CircuitBreaker
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """The model could not produce a response"""
+
+
+class LLMTimeout(LLMError):
+    """The call (or the wait for a free slot) ran past its deadline"""
+
+
+class CircuitOpen(LLMError):
+    """The model has been failing, so the call was refused without being made"""
+
+
+class LLMGateway:
+    """Shared model provider with per-call deadlines, a concurrency limit and a circuit breaker"""
+
+    def __init__(self, provider, timeout, max_concurrency, budgets=None, breaker=None):
+        self.provider = provider
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        # Per-feature latency budgets (seconds); features without one use `timeout`
+        self.budgets = budgets or {}
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Identical prompts in flight at the same time share one call
+        self.singleflight = SingleFlight()
+
+    def timeout_for(self, feature, timeout=None):
+        if timeout is not None:
+            return timeout
+        return self.budgets.get(feature, self.timeout)
+
+    def generate(self, feature, prompt, timeout=None, json_mode=False):
+        """Run one prompt and return the response text, or raise LLMError
+
+        json_mode asks the model for an application/json response.
+        """
+        timeout = self.timeout_for(feature, timeout)
+        try:
+            return self.singleflight.do(
+                _flight_key(feature, prompt, json_mode),
+                lambda: self._generate(feature, prompt, timeout, json_mode),
+                timeout=timeout,
+            )
+        except TimeoutError as exc:
+            raise LLMTimeout(f"{feature}: no response within {timeout:.1f}s") from exc
+
+    def _generate(self, feature, prompt, timeout, json_mode):
+        deadline = time.monotonic() + timeout
+
+        with self._slot(feature, timeout, deadline) as remaining:
+            try:
+                return self.provider.generate(feature, prompt, remaining, json_mode=json_mode)
+            except Exception as exc:
+                raise self._as_llm_error(feature, exc, timeout, deadline) from exc
+
+    def stream(self, feature, prompt, timeout=None):
+        """Yield response text chunks as the model produces them; the slot is held until the end"""
+        timeout = self.timeout_for(feature, timeout)
+        deadline = time.monotonic() + timeout
+
+        with self._slot(feature, timeout, deadline) as remaining:
+            try:
+                for chunk in self.provider.stream(feature, prompt, remaining):
+                    if time.monotonic() >= deadline:
+                        raise LLMTimeout(f"{feature}: stream ran past {timeout:.1f}s")
+                    yield chunk
+            except LLMError:
+                raise
+            except Exception as exc:
+                raise self._as_llm_error(feature, exc, timeout, deadline) from exc
+
+    @contextmanager
+    def _slot(self, feature, timeout, deadline):
+        # While the circuit is open, fail straight away so the view renders its fallback
+        if not self.breaker.allow():
+            raise CircuitOpen(f"{feature}: {self.provider.name} circuit is open")
+
+        # Waiting for a slot counts against the same deadline as the call itself.
+        # Queueing behind our own calls says nothing about the provider's health,
+        # so it never counts as a failure; it only gives up a half-open probe.
+        if not self._slots.acquire(timeout=timeout):
+            self.breaker.record_skipped()
+            raise LLMTimeout(f"{feature}: no free LLM slot within {timeout:.1f}s")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._slots.release()
+            self.breaker.record_skipped()
+            raise LLMTimeout(f"{feature}: deadline passed while waiting for a slot")
+        try:
+            yield remaining
+        except GeneratorExit:
+            # A stream abandoned by its reader was still working
+            self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._slots.release()
+
+    def _as_llm_error(self, feature, exc, timeout, deadline):
+        if time.monotonic() >= deadline:
+            return LLMTimeout(f"{feature}: no response within {timeout:.1f}s")
+        logger.warning("LLM call for %s failed: %s", feature, exc)
+        return LLMError(f"{feature}: {exc}")
+
+    async def agenerate(self, feature, prompt, timeout=None, json_mode=False):
+        """Async version of generate() for ASGI views"""
+        timeout = self.timeout_for(feature, timeout)
+        try:
+            # The blocking call runs in a worker thread, so the sync and async
+            # paths share one concurrency limit. Coroutines waiting on the same
+            # prompt share that thread instead of starting their own.
+            return await self.singleflight.ado(
+                _flight_key(feature, prompt, json_mode),
+                lambda: asyncio.to_thread(self.generate, feature, prompt, timeout, json_mode),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError as exc:
+            raise LLMTimeout(f"{feature}: no response within {timeout:.1f}s") from exc
+
+    async def astream(self, feature, prompt, timeout=None):
+        """Async version of stream(); chunks are pumped from a worker thread"""
+        timeout = self.timeout_for(feature, timeout)
+        deadline = time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+
+        def pump():
+            try:
+                for chunk in self.stream(feature, prompt, timeout):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as exc:
+                loop.call_soon_threadsafe(queue.put_nowait, exc)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        pumping = loop.run_in_executor(None, pump)
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(remaining, 0))
+                except asyncio.TimeoutError as exc:
+                    raise LLMTimeout(f"{feature}: stream ran past {timeout:.1f}s") from exc
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Don't leave the pump's future unobserved if the client went away
+            pumping.add_done_callback(lambda f: f.exception())
+
+
+def _flight_key(feature, prompt, json_mode=False):
+    return hashlib.sha256(f"{feature}\x1f{json_mode}\x1f{prompt}".encode('utf-8')).hexdigest()
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+_observers = []
+
+
+def add_observer(callback):
+    """Call callback(feature, seconds) after every generate/stream call, whether it succeeded or not"""
+    _observers.append(callback)
+
+
+@contextmanager
+def _observed(feature, prompt):
+    """
+    Time one call for the observers, /metrics and the ledger; the caller adds to call['output_chars'].
+
+    A call that joined an identical one in flight (call['coalesced'], set by
+    the single-flight layer) made no model call of its own: it's counted
+    apart, so calls, failures and tokens aren't multiplied by its followers.
+    """
+    call = {'output_chars': 0, 'coalesced': False}
+    error = None
+    metrics.LLM_IN_FLIGHT.inc(feature)
+    started = time.monotonic()
+    try:
+        yield call
+    except BaseException as exc:
+        # Including timeouts, an open breaker and cancellation by a disconnected client
+        error = type(exc).__name__
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        metrics.LLM_IN_FLIGHT.dec(feature)
+        if call['coalesced']:
+            metrics.LLM_COALESCED.inc(feature)
+        else:
+            metrics.LLM_CALLS.inc(feature)
+            metrics.LLM_DURATION.observe(elapsed, feature)
+            if error:
+                metrics.LLM_FAILURES.inc(feature)
+        ledger.record(
+            feature, 'error' if error else 'ok', prompt_chars=len(prompt),
+            output_chars=call['output_chars'], seconds=elapsed, error=error,
+            cache='coalesced' if call['coalesced'] else None,
+        )
+        for callback in _observers:
+            callback(feature, elapsed)
+
+
+def fallback(feature):
+    """Note that a page showed canned content for `feature` instead of AI output"""
+    metrics.LLM_FALLBACKS.inc(feature)
+    ledger.record(feature, 'fallback')
+
+
+def get_gateway():
+    """Return the process-wide gateway, building it from settings on first use"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(
+                    provider=providers.from_settings(),
+                    timeout=settings.LLM_TIMEOUT,
+                    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                    budgets=settings.LLM_LATENCY_BUDGETS,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+                        reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+                    ),
+                )
+    return _gateway
+
+
+def generate(feature, prompt, timeout=None, json_mode=False):
+    with _observed(feature, prompt) as call:
+        token = singleflight.joined.set(call)
+        try:
+            text = get_gateway().generate(feature, prompt, timeout=timeout, json_mode=json_mode)
+        finally:
+            singleflight.joined.reset(token)
+        call['output_chars'] = len(text or '')
+        return text
+
+
+async def agenerate(feature, prompt, timeout=None, json_mode=False):
+    with _observed(feature, prompt) as call:
+        token = singleflight.joined.set(call)
+        try:
+            text = await get_gateway().agenerate(feature, prompt, timeout=timeout, json_mode=json_mode)
+        finally:
+            singleflight.joined.reset(token)
+        call['output_chars'] = len(text or '')
+        return text
+
+
+def stream(feature, prompt, timeout=None):
+    # Observed until the stream ends, including the time the reader spends between chunks
+    with _observed(feature, prompt) as call:
+        for chunk in get_gateway().stream(feature, prompt, timeout=timeout):
+            call['output_chars'] += len(chunk)
+            yield chunk
+
+
+async def astream(feature, prompt, timeout=None):
+    with _observed(feature, prompt) as call:
+        async for chunk in get_gateway().astream(feature, prompt, timeout=timeout):
+            call['output_chars'] += len(chunk)
+            yield chunk
@@ -0,0 +1,176 @@
+"""
+Response cache for LLM-generated text.
+
+Many prompts are nearly identical (same mood_type, empty or short notes), so
+their answers are cached under a hash of the prompt template name and its
+normalized inputs. The in-memory tier is an LRU bounded by entry count and by
+total size, with a TTL per feature. An optional on-disk tier (LLM_CACHE_DIR)
+keeps answers across restarts and between worker processes.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+
+from . import ledger
+
+
+def normalize(value):
+    """Lower-case and collapse whitespace so trivial differences share a key"""
+    if value is None:
+        return ''
+    return ' '.join(str(value).lower().split())
+
+
+def make_key(template, mood_type='', note='', username='', extra=''):
+    raw = '\x1f'.join([template, normalize(mood_type), normalize(note), normalize(username), normalize(extra)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU+TTL cache with an optional file-based second tier"""
+
+    def __init__(self, max_entries, max_bytes, ttls, default_ttl, disk_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_dir:
+            self._disk = FileBasedCache(str(disk_dir), {
+                'TIMEOUT': None,
+                'OPTIONS': {'MAX_ENTRIES': max_entries * 10},
+            })
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl_for(self, feature):
+        return self.ttls.get(feature, self.default_ttl)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self._size -= size
+
+        if self._disk is not None:
+            stored = self._disk.get(key)
+            if stored is not None and stored[0] > now:
+                self._remember(key, stored[1], stored[0])
+                with self._lock:
+                    self.disk_hits += 1
+                return stored[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, feature, value):
+        expires_at = time.time() + self.ttl_for(feature)
+        self._remember(key, value, expires_at)
+        if self._disk is not None:
+            self._disk.set(key, (expires_at, value), timeout=self.ttl_for(feature))
+
+    def _remember(self, key, value, expires_at):
+        size = len(key) + len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (expires_at, size, value)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def get_or_generate(self, feature, producer, mood_type='', note='', username='', extra=''):
+        """Return the cached answer or call producer() and cache a non-empty result"""
+        key = make_key(feature, mood_type, note, username, extra)
+        started = time.monotonic()
+        value = self.get(key)
+        if value is not None:
+            ledger.record(feature, 'ok', output_chars=len(value), seconds=time.monotonic() - started, cache='hit')
+            return value
+        token = ledger.cache_status.set('miss')
+        try:
+            value = producer()
+        finally:
+            ledger.cache_status.reset(token)
+        if value:
+            self.set(key, feature, value)
+        return value
+
+    async def aget_or_generate(self, feature, producer, mood_type='', note='', username='', extra=''):
+        """Async version of get_or_generate(); producer() returns an awaitable"""
+        key = make_key(feature, mood_type, note, username, extra)
+        started = time.monotonic()
+        value = self.get(key)
+        if value is not None:
+            ledger.record(feature, 'ok', output_chars=len(value), seconds=time.monotonic() - started, cache='hit')
+            return value
+        token = ledger.cache_status.set('miss')
+        try:
+            value = await producer()
+        finally:
+            ledger.cache_status.reset(token)
+        if value:
+            self.set(key, feature, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide response cache, building it from settings on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    max_bytes=settings.LLM_CACHE_MAX_BYTES,
+                    ttls=settings.LLM_CACHE_TTLS,
+                    default_ttl=settings.LLM_CACHE_DEFAULT_TTL,
+                    disk_dir=settings.LLM_CACHE_DIR,
+                )
+    return _cache
@@ -0,0 +1,31 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp import distribution, rollups
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the MoodDailyRollup table (and, for all users, the site-wide "
+            "MoodTypeCounter rows) from existing Mood rows")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help="Only rebuild this user's rollups (repeatable)")
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        started = time.monotonic()
+        written = rollups.rebuild(users=users)
+        if users is None:
+            distribution.rebuild()
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily rollup rows in {elapsed:.1f}s"))
@@ -0,0 +1,116 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from myapp.dates import month_bounds
+from myapp.models import Mood
+
+
+class Command(BaseCommand):
+    help = ("Seed a throwaway test database with Mood rows and print EXPLAIN QUERY PLAN "
+            "and timings for the hot Mood queries, with and without the composite indexes")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=730,
+                            help="Spread entries over this many past days")
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Runs per query; the median is reported")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        # Never touch the real database: build a fresh test database and drop it afterwards
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        started = time.monotonic()
+        user = self.seed(options['rows'], options['users'], options['days'], options['seed'])
+        self.stdout.write(f"Seeded {options['rows']} moods for {options['users']} users "
+                          f"in {time.monotonic() - started:.1f}s")
+
+        if connection.vendor == 'sqlite':
+            # Give the query planner statistics, as a long-lived database would have
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        with_indexes = self.measure(user, options['repeat'], "With composite indexes")
+
+        # Same queries with the composite indexes dropped, for comparison
+        with connection.schema_editor() as editor:
+            for index in Mood._meta.indexes:
+                editor.remove_index(Mood, index)
+        without_indexes = self.measure(user, options['repeat'], "Without composite indexes")
+
+        self.stdout.write("")
+        self.stdout.write(f"{'query':<28} {'with indexes':>14} {'without':>14}")
+        for name in with_indexes:
+            self.stdout.write(f"{name:<28} {with_indexes[name]:>11.3f} ms {without_indexes[name]:>11.3f} ms")
+
+    def seed(self, rows, users, days, seed):
+        rng = random.Random(seed)
+        user_ids = [
+            u.id for u in User.objects.bulk_create(
+                [User(username=f"bench_{i}") for i in range(users)]
+            )
+        ]
+        mood_types = [code for code, _ in Mood.MOOD_CHOICES]
+        now = timezone.now()
+        adapt = connection.ops.adapt_datetimefield_value
+        insert = f"INSERT INTO {Mood._meta.db_table} (user_id, note, mood_type, created_at) VALUES (%s, %s, %s, %s)"
+
+        # Raw executemany: bulk_create is far slower at this size and
+        # the benchmark doesn't need the rollup signals
+        batch = []
+        with connection.cursor() as cursor:
+            for _ in range(rows):
+                created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+                batch.append((rng.choice(user_ids), "", rng.choice(mood_types), adapt(created_at)))
+                if len(batch) == 10000:
+                    cursor.executemany(insert, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert, batch)
+        return User.objects.get(id=user_ids[0])
+
+    def queries(self, user):
+        now = timezone.now()
+        month_start, month_end = month_bounds()
+        mine = Mood.objects.filter(user=user)
+        return {
+            'latest 20': lambda: mine.order_by('-created_at')[:20],
+            'month (__month/__year)': lambda: mine.filter(
+                created_at__month=now.month, created_at__year=now.year),
+            'month (half-open range)': lambda: mine.filter(
+                created_at__gte=month_start, created_at__lt=month_end),
+            'sad this month': lambda: mine.filter(
+                mood_type='sad', created_at__gte=month_start, created_at__lt=month_end),
+        }
+
+    def measure(self, user, repeat, heading):
+        self.stdout.write("")
+        self.stdout.write(self.style.MIGRATE_HEADING(heading))
+
+        timings = {}
+        for name, build in self.queries(user).items():
+            self.stdout.write(f"  {name}:")
+            for line in build().explain().splitlines():
+                self.stdout.write(f"    {line}")
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(build().values_list('id', flat=True))
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[name] = statistics.median(samples)
+        return timings
@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from myapp import generation
+from myapp.models import DailyWisdom, Mood
+
+
+class Command(BaseCommand):
+    help = "Pre-generate today's Daily Wisdom for every active user (run once a day, e.g. from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help="Concurrent LLM calls (capped at LLM_MAX_CONCURRENCY)")
+        parser.add_argument('--active-days', type=int, default=30,
+                            help="Only users who journaled within this many days")
+        parser.add_argument('--date', help="Date to generate for (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--force', action='store_true',
+                            help="Regenerate quotes that already exist")
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date must look like YYYY-MM-DD")
+
+        cutoff = timezone.now() - timedelta(days=options['active_days'])
+        latest_mood = Mood.objects.filter(user=OuterRef('pk')).order_by('-created_at').values('mood_type')[:1]
+        users = list(
+            User.objects.filter(is_active=True, mood__created_at__gte=cutoff)
+            .distinct()
+            .annotate(recent_mood=Subquery(latest_mood))
+            .values_list('id', 'username', 'recent_mood')
+        )
+
+        if not options['force']:
+            done = set(
+                DailyWisdom.objects.filter(date=day).values_list('user_id', 'mood_type')
+            )
+            users = [u for u in users if (u[0], u[2]) not in done]
+
+        self.stdout.write(f"Generating daily wisdom for {len(users)} users on {day}")
+
+        # More threads than gateway slots would only queue, and the wait counts against the deadline
+        workers = max(min(options['workers'], settings.LLM_MAX_CONCURRENCY), 1)
+        succeeded = failed = 0
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Nobody is waiting on a page: use the general LLM_TIMEOUT, not the interactive 'wisdom' budget
+            futures = {
+                pool.submit(generation.generate_wisdom, username, mood_type, timeout=settings.LLM_TIMEOUT):
+                    (user_id, username, mood_type)
+                for user_id, username, mood_type in users
+            }
+            # Only the LLM calls run in the pool; rows are written from this thread
+            # so SQLite never sees competing writers
+            for future in as_completed(futures):
+                user_id, username, mood_type = futures[future]
+                try:
+                    text = future.result()
+                except Exception as exc:
+                    self.stderr.write(f"{username}: {exc}")
+                    text = None
+                if not text:
+                    failed += 1
+                    continue
+                DailyWisdom.objects.update_or_create(
+                    user_id=user_id, date=day, mood_type=mood_type,
+                    defaults={'text': text},
+                )
+                succeeded += 1
+        elapsed = time.monotonic() - started
+
+        rate = len(users) / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.1f}s: {succeeded} generated, {failed} failed, {rate:.2f} users/sec"
+        ))
+
@@ -0,0 +1,110 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from myapp import ledger
+from myapp.stats import percentile
+
+# Same rule of thumb as summarize.estimate_tokens
+CHARS_PER_TOKEN = 4
+
+
+class Command(BaseCommand):
+    help = ("Summarize the LLM call ledger per feature: calls, errors, fallbacks, cache hit rate, "
+            "coalesced requests, p50/p95/p99 latency, estimated prompt/output tokens, and calls per day")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Ledger file (default: LLM_LEDGER_PATH)")
+        parser.add_argument('--days', type=int, default=30, help="Only the last N days (0: everything)")
+        parser.add_argument('--feature', action='append', dest='features', metavar='NAME',
+                            help="Only this feature (repeatable)")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        # Whatever this process still has buffered, e.g. when called from a shell
+        ledger.flush()
+        path = options['path'] or settings.LLM_LEDGER_PATH
+        if not path or not os.path.exists(path):
+            raise CommandError(f"No ledger at {path or '(LLM_LEDGER_PATH is empty)'}")
+
+        since = None
+        if options['days']:
+            since = (timezone.now() - timedelta(days=options['days'])).timestamp()
+
+        features = {}
+        for entry in ledger.read(path):
+            if since is not None and entry['ts'] < since:
+                continue
+            if options['features'] and entry['feature'] not in options['features']:
+                continue
+            features.setdefault(entry['feature'], []).append(entry)
+
+        report = {feature: summarize(entries) for feature, entries in sorted(features.items())}
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def print_report(self, report):
+        if not report:
+            self.stdout.write("No ledger records in range")
+            return
+
+        header = (f"{'feature':<20}{'calls':>8}{'errors':>8}{'fallbk':>8}{'hit %':>7}{'shared':>8}"
+                  f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'in tok':>11}{'out tok':>10}")
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for feature, row in sorted(report.items(), key=lambda item: -item[1]['calls']):
+            self.stdout.write(
+                f"{feature:<20}{row['calls']:>8}{row['errors']:>8}{row['fallbacks']:>8}"
+                f"{row['cache_hit_rate'] * 100:>7.1f}{row['coalesced']:>8}"
+                f"{_ms(row['p50_ms']):>9}{_ms(row['p95_ms']):>9}{_ms(row['p99_ms']):>9}"
+                f"{row['prompt_tokens']:>11,}{row['output_tokens']:>10,}"
+            )
+
+        self.stdout.write("\nModel calls per day")
+        days = sorted({day for row in report.values() for day in row['daily']})
+        features = sorted(report)
+        self.stdout.write(f"{'day':<12}" + "".join(f"{feature[:14]:>16}" for feature in features))
+        for day in days:
+            self.stdout.write(
+                f"{day:<12}" + "".join(f"{report[feature]['daily'].get(day, 0):>16}" for feature in features)
+            )
+
+
+def summarize(entries):
+    """Totals for one feature. `calls` are model calls; cache hits, coalesced requests and fallbacks are counted apart"""
+    calls = [e for e in entries if e['outcome'] != 'fallback' and e['cache'] not in ('hit', 'coalesced')]
+    hits = sum(1 for e in entries if e['cache'] == 'hit')
+    latencies = sorted(e['ms'] for e in calls if e['ms'] is not None)
+    prompt_chars = sum(e['prompt_chars'] or 0 for e in calls)
+    output_chars = sum(e['output_chars'] or 0 for e in calls)
+
+    daily = {}
+    for e in calls:
+        day = timezone.localtime(datetime.fromtimestamp(e['ts'], tz=dt_timezone.utc)).date().isoformat()
+        daily[day] = daily.get(day, 0) + 1
+
+    return {
+        'calls': len(calls),
+        'errors': sum(1 for e in calls if e['outcome'] == 'error'),
+        'fallbacks': sum(1 for e in entries if e['outcome'] == 'fallback'),
+        'cache_hits': hits,
+        'cache_hit_rate': round(hits / (hits + len(calls)), 3) if hits + len(calls) else 0.0,
+        'coalesced': sum(1 for e in entries if e['cache'] == 'coalesced'),
+        'p50_ms': percentile(latencies, 50) if latencies else None,
+        'p95_ms': percentile(latencies, 95) if latencies else None,
+        'p99_ms': percentile(latencies, 99) if latencies else None,
+        'total_seconds': round(sum(latencies) / 1000, 1),
+        'prompt_tokens': prompt_chars // CHARS_PER_TOKEN,
+        'output_tokens': output_chars // CHARS_PER_TOKEN,
+        'daily': dict(sorted(daily.items())),
+    }
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.0f}"
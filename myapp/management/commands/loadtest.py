@@ -0,0 +1,263 @@
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from myapp import distribution, llm, rollups, urls
+from myapp.models import Mood
+from myapp.stats import percentile
+
+# Routes left out of the run, and why
+SKIPPED = {
+    'logout': "ends the client's session",
+}
+
+NOTES = [
+    "Long day at work, but the evening walk helped.",
+    "Couldn't sleep well, feeling foggy and slow.",
+    "Had coffee with a friend and laughed a lot.",
+    "Deadline stress again. Too many things at once.",
+    "Quiet morning, journaled and stretched before breakfast.",
+    "Argued with my brother about something small.",
+    "",
+]
+
+
+class Command(BaseCommand):
+    help = ("Seed a throwaway test database with loadtest_ users and their mood history, drive every "
+            "named myapp route with concurrent logged-in clients (in-process, through the full "
+            "middleware stack) and print throughput and p50/p95/p99 latency per route as JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--history', type=int, default=365,
+                            help="Mood entries per user, spread over the past --days")
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--clients', type=int, default=8, help="Concurrent clients")
+        parser.add_argument('--requests', type=int, default=50, help="Measured requests per route")
+        parser.add_argument('--warmup', type=int, default=5,
+                            help="Unmeasured requests per route before timing it")
+        parser.add_argument('--route', action='append', dest='routes', metavar='NAME',
+                            help="Only run this route, e.g. 'mood_history' or 'mood_entry POST' (repeatable)")
+        parser.add_argument('--real-llm', action='store_true',
+                            help="Use the configured LLM_PROVIDER instead of the local fake")
+        parser.add_argument('--llm-latency-scale', type=float, default=1.0,
+                            help="Multiplier for the fake provider's latencies (0 for instant answers)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+        parser.add_argument('--baseline', help="Earlier JSON report to compare p95 latencies against")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed p95 growth over the baseline before a route counts as a regression")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError("--users, --clients and --requests must be at least 1")
+
+        overrides = {
+            'DEBUG': False,
+            'ALLOWED_HOSTS': ['testserver'],
+            # Synthetic traffic stays out of the capacity-planning ledger
+            'LLM_LEDGER_PATH': '',
+        }
+        if not options['real_llm']:
+            overrides.update(LLM_PROVIDER='fake', LLM_FAKE_LATENCY_SCALE=options['llm_latency_scale'])
+
+        # Never touch the real database. SQLite gets a file instead of the usual
+        # in-memory test database, so concurrent clients can write to it.
+        old_name = connection.settings_dict['NAME']
+        scratch_dir = None
+        if connection.vendor == 'sqlite':
+            scratch_dir = tempfile.mkdtemp(prefix='moodmirror-loadtest-')
+            connection.settings_dict['TEST']['NAME'] = os.path.join(scratch_dir, 'loadtest.sqlite3')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(**overrides):
+                # The gateway is rebuilt with the load test's provider, and again afterwards
+                llm._gateway = None
+                try:
+                    report = self.run(options)
+                finally:
+                    llm._gateway = None
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if scratch_dir:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['tolerance'])
+
+    def log(self, message):
+        # Progress goes to stderr so stdout stays valid JSON
+        self.stderr.write(message)
+
+    def run(self, options):
+        started = time.monotonic()
+        users, latest_moods = self.seed(options['users'], options['history'], options['days'], options['seed'])
+        self.log(f"Seeded {options['users']} users x {options['history']} moods "
+                 f"in {time.monotonic() - started:.1f}s")
+
+        plan = self.plan(latest_moods)
+        if options['routes']:
+            unknown = set(options['routes']) - set(plan)
+            if unknown:
+                raise CommandError(f"Unknown route(s): {', '.join(sorted(unknown))}")
+            plan = {label: plan[label] for label in options['routes']}
+
+        # One logged-in client per worker thread, users handed out round-robin
+        local = threading.local()
+        handed_out = iter(range(sys.maxsize))
+        handed_out_lock = threading.Lock()
+
+        def client():
+            if not hasattr(local, 'client'):
+                with handed_out_lock:
+                    user = users[next(handed_out) % len(users)]
+                local.client = Client()
+                local.client.force_login(user)
+                local.user = user
+            return local.client, local.user
+
+        def call(method, build):
+            test_client, user = client()
+            path, data = build(user)
+            began = time.perf_counter()
+            try:
+                response = getattr(test_client, method)(path, data)
+                if response.streaming:
+                    # Time the whole body, not just the first byte
+                    if response.is_async:
+                        async_to_sync(drain)(response.streaming_content)
+                    else:
+                        b''.join(response.streaming_content)
+                status = response.status_code
+            except Exception as exc:
+                # Reported by class, e.g. OperationalError when SQLite writers collide
+                status = type(exc).__name__
+            return (time.perf_counter() - began) * 1000, status
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+            for label, (method, build) in plan.items():
+                self.log(f"  {label}")
+                list(pool.map(lambda _: call(method, build), range(options['warmup'])))
+                phase_started = time.perf_counter()
+                samples = list(pool.map(lambda _: call(method, build), range(options['requests'])))
+                results[label] = summarize(samples, time.perf_counter() - phase_started)
+
+        return {
+            'config': {
+                key: options[key]
+                for key in ('users', 'history', 'days', 'clients', 'requests', 'warmup', 'seed',
+                            'real_llm', 'llm_latency_scale')
+            },
+            'database': connection.vendor,
+            'llm_provider': settings.LLM_PROVIDER if options['real_llm'] else 'fake',
+            'skipped': SKIPPED,
+            'routes': results,
+        }
+
+    def seed(self, users, history, days, seed):
+        rng = random.Random(seed)
+        # Staff, so the staff-only llm_status route is exercised too
+        created = User.objects.bulk_create(
+            [User(username=f"loadtest_{i}", is_staff=True, password='!') for i in range(users)]
+        )
+        mood_types = [code for code, _ in Mood.MOOD_CHOICES]
+        now = timezone.now()
+        adapt = connection.ops.adapt_datetimefield_value
+        insert = f"INSERT INTO {Mood._meta.db_table} (user_id, note, mood_type, created_at) VALUES (%s, %s, %s, %s)"
+
+        # Raw inserts: created_at is auto_now_add, so the ORM would stamp every row with now
+        with connection.cursor() as cursor:
+            for user in created:
+                cursor.executemany(insert, [
+                    (user.id, rng.choice(NOTES), rng.choice(mood_types),
+                     adapt(now - timedelta(seconds=rng.randrange(days * 86400))))
+                    for _ in range(history)
+                ])
+
+        # Derived tables the views read instead of Mood
+        rollups.rebuild()
+        distribution.rebuild()
+
+        latest_moods = {
+            user.id: Mood.objects.filter(user=user).order_by('-created_at').values_list('id', flat=True).first()
+            for user in created
+        }
+        return created, latest_moods
+
+    def plan(self, latest_moods):
+        """{label: (client method, build(user) -> (path, data))} for every named route"""
+        def get(name):
+            return 'get', lambda user: (reverse(name), None)
+
+        plan = {}
+        for pattern in urls.urlpatterns:
+            name = pattern.name
+            if not name or name in SKIPPED or pattern.pattern.converters:
+                continue
+            plan[name] = get(name)
+
+        plan['suggestion_status'] = ('get', lambda user: (
+            reverse('suggestion_status', args=[latest_moods[user.id] or 0]), None))
+        plan['mood_entry POST'] = ('post', lambda user: (
+            reverse('mood_entry'), {'mood_type': random.choice(Mood.MOOD_CHOICES)[0], 'note': random.choice(NOTES) or "ok"}))
+        return plan
+
+    def compare(self, report, baseline_path, tolerance):
+        with open(baseline_path) as f:
+            baseline = json.load(f)['routes']
+
+        regressions = []
+        for label, current in report['routes'].items():
+            before = baseline.get(label)
+            if before and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{label}: p95 {before['p95_ms']:.1f} ms -> {current['p95_ms']:.1f} ms")
+        if regressions:
+            raise CommandError("p95 regressions against the baseline:\n  " + "\n  ".join(regressions))
+        self.log(self.style.SUCCESS(f"No route's p95 grew more than {tolerance:.0%} over the baseline"))
+
+
+async def drain(content):
+    async for _ in content:
+        pass
+
+
+def summarize(samples, wall_seconds):
+    latencies = sorted(ms for ms, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 500)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'statuses': statuses,
+        'throughput_rps': round(len(samples) / wall_seconds, 1) if wall_seconds else None,
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2),
+    }
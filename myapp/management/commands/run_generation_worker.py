@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from myapp import jobs
+
+
+class Command(BaseCommand):
+    help = "Drain the GenerationJob queue with a pool of worker threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help="Concurrent jobs (LLM calls)")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        done = failed = 0
+
+        self.stdout.write(f"Generation worker started with {threads} threads")
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            try:
+                while True:
+                    jobs.requeue_stale()
+                    batch = jobs.claim(threads * 2)
+                    if not batch:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll'])
+                        continue
+
+                    # Only the LLM calls run in the pool; results are saved from this thread
+                    futures = {pool.submit(jobs.run_job, job): job for job in batch}
+                    for future in as_completed(futures):
+                        try:
+                            ok = jobs.finish_job(futures[future], text=future.result())
+                        except Exception as exc:
+                            ok = jobs.finish_job(futures[future], error=exc)
+                        if ok:
+                            done += 1
+                        else:
+                            failed += 1
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping worker")
+
+        self.stdout.write(self.style.SUCCESS(f"Worker finished: {done} done, {failed} failed"))
@@ -0,0 +1,291 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+Counters, gauges and histograms keep one shard per thread, so recording a
+value is a dict update with no lock; a scrape adds the shards up. When a
+thread exits, its shard is folded into the metric's base totals, so
+short-lived threads (ASGI's per-request sync threads, summarize's
+executors) don't pile up. With
+METRICS_DIR set, every process (web workers, the generation worker) writes
+a snapshot file there every METRICS_FLUSH_SECONDS and at exit, and /metrics
+adds up every process's numbers. Gauges of processes that have exited are
+dropped, counters and histograms are kept. Empty the directory when the app
+is redeployed.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = {}
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Live threads' shards by id, and what exited threads had recorded
+        self._shards = {}
+        self._base = {}
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+        _registry[name] = self
+
+    def _shard(self):
+        # Each thread only ever writes its own shard; the lock is taken once per thread
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            # The thread-local owner is freed when the thread exits, which retires the shard
+            owner = self._local.owner = _ShardOwner()
+            with self._shards_lock:
+                self._shards[id(shard)] = shard
+            weakref.finalize(owner, self._retire, shard)
+            self._local.shard = shard
+        return shard
+
+    def _retire(self, shard):
+        with self._shards_lock:
+            self._shards.pop(id(shard), None)
+            self._add(self._base, shard)
+
+    def _add(self, totals, shard):
+        for labels, value in list(shard.items()):
+            totals[labels] = self._merge(totals[labels], value) if labels in totals else self._copy(value)
+
+    def _merge(self, total, value):
+        return total + value
+
+    def collect(self):
+        """{label values: value} summed over every thread, live or exited"""
+        merged = {}
+        # Under the lock, so a shard retiring mid-scrape isn't counted twice
+        with self._shards_lock:
+            self._add(merged, self._base)
+            for shard in self._shards.values():
+                self._add(merged, shard)
+        return merged
+
+    def _copy(self, value):
+        return value
+
+
+class _ShardOwner:
+    """Weak-referenceable token kept in a thread's local storage"""
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """Up/down count, e.g. calls in flight; only inc()/dec(), so per-thread shards still add up"""
+
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Bucket counts (not cumulative) followed by the sum and the count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            counts = shard[labels] = [0] * (len(self.buckets) + 3)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def _merge(self, total, value):
+        return [a + b for a, b in zip(total, value)]
+
+    def _copy(self, value):
+        return list(value)
+
+
+REQUEST_DURATION = Histogram(
+    'moodmirror_request_duration_seconds', "Time to produce a response, by URL name", ['view'])
+
+LLM_CALLS = Counter('moodmirror_llm_calls_total', "LLM calls made, by feature", ['feature'])
+
+LLM_COALESCED = Counter(
+    'moodmirror_llm_coalesced_total', "LLM requests that shared an identical call already in flight, by feature",
+    ['feature'])
+
+LLM_FAILURES = Counter(
+    'moodmirror_llm_failures_total', "LLM calls that failed or timed out, by feature", ['feature'])
+
+LLM_FALLBACKS = Counter(
+    'moodmirror_llm_fallbacks_total', "Pages that showed fallback content instead of AI output, by feature",
+    ['feature'])
+
+LLM_DURATION = Histogram('moodmirror_llm_call_duration_seconds', "LLM call latency, by feature", ['feature'])
+
+LLM_IN_FLIGHT = Gauge('moodmirror_llm_calls_in_flight', "LLM calls currently running, by feature", ['feature'])
+
+
+def snapshot():
+    return {
+        name: {
+            'kind': metric.kind,
+            'help': metric.help,
+            'labelnames': metric.labelnames,
+            'buckets': getattr(metric, 'buckets', None),
+            'values': [[list(labels), value] for labels, value in metric.collect().items()],
+        }
+        for name, metric in _registry.items()
+    }
+
+
+def _snapshot_path(pid):
+    return os.path.join(settings.METRICS_DIR, f"{pid}.json")
+
+
+def write_snapshot():
+    """Write this process's numbers to METRICS_DIR (atomically, so readers never see half a file)"""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(snapshot(), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _other_snapshots():
+    """(pid, snapshot) for every other process that has written to METRICS_DIR"""
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if ext != '.json' or not stem.isdigit() or int(stem) == os.getpid():
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, name)) as f:
+                yield int(stem), json.load(f)
+        except (OSError, ValueError):
+            continue
+
+
+def gather():
+    """This process's live numbers plus, with METRICS_DIR, every other process's latest snapshot"""
+    merged = snapshot()
+    if not settings.METRICS_DIR:
+        return merged
+
+    totals = {name: {tuple(labels): value for labels, value in data['values']} for name, data in merged.items()}
+    for pid, other in _other_snapshots():
+        alive = None
+        for name, data in other.items():
+            metric = _registry.get(name)
+            if metric is None:
+                continue
+            if metric.kind == 'gauge':
+                # A gauge of a process that has exited no longer means anything
+                alive = _alive(pid) if alive is None else alive
+                if not alive:
+                    continue
+            for labels, value in data['values']:
+                labels = tuple(labels)
+                current = totals[name].get(labels)
+                totals[name][labels] = value if current is None else metric._merge(current, value)
+
+    for name, data in merged.items():
+        data['values'] = [[list(labels), value] for labels, value in totals[name].items()]
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(metrics):
+    """Prometheus text exposition of gather()'s output"""
+    lines = []
+    for name, data in sorted(metrics.items()):
+        lines.append(f"# HELP {name} {data['help']}")
+        lines.append(f"# TYPE {name} {data['kind']}")
+        for labels, value in sorted(data['values']):
+            if data['kind'] != 'histogram':
+                lines.append(f"{name}{_labels(data['labelnames'], labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*data['buckets'], '+Inf'], value[:-2]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(float(bound))
+                lines.append(f"{name}_bucket{_labels(data['labelnames'], labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(data['labelnames'], labels)} {_number(float(value[-2]))}")
+            lines.append(f"{name}_count{_labels(data['labelnames'], labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+_flusher = None
+
+
+def start_flusher():
+    """Write snapshots every METRICS_FLUSH_SECONDS and at exit; called from MyappConfig.ready()"""
+    global _flusher
+    if _flusher is not None or not settings.METRICS_DIR:
+        return
+
+    def flush_forever():
+        while True:
+            time.sleep(settings.METRICS_FLUSH_SECONDS)
+            try:
+                write_snapshot()
+            except OSError:
+                pass
+
+    _flusher = threading.Thread(target=flush_forever, name='metrics-flusher', daemon=True)
+    _flusher.start()
+    atexit.register(write_snapshot)
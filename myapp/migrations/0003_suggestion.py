@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-16 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_mood_mood_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('mood', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='suggestion', to='myapp.mood')),
+            ],
+        ),
+    ]
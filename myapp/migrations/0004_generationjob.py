@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-16 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_suggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('suggestion', 'Suggestion'), ('playlist', 'Playlist description'), ('challenges', 'Mindful challenges')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('mood', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_jobs', to='myapp.mood')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='myapp_gener_status_770304_idx')],
+            },
+        ),
+    ]
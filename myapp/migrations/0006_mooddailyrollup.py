@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_dailywisdom'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('happy', models.PositiveIntegerField(default=0)),
+                ('sad', models.PositiveIntegerField(default=0)),
+                ('anxious', models.PositiveIntegerField(default=0)),
+                ('angry', models.PositiveIntegerField(default=0)),
+                ('calm', models.PositiveIntegerField(default=0)),
+                ('tired', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('first_at', models.DateTimeField()),
+                ('last_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='unique_mood_daily_rollup')],
+            },
+        ),
+    ]
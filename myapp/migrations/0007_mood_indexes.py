@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_mooddailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mood',
+            index=models.Index(fields=['user', 'created_at'], name='myapp_mood_user_id_4ac1ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mood',
+            index=models.Index(fields=['user', 'mood_type', 'created_at'], name='myapp_mood_user_id_a6b39d_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:03
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_moods(apps, schema_editor):
+    Mood = apps.get_model('myapp', 'Mood')
+    MoodTypeCounter = apps.get_model('myapp', 'MoodTypeCounter')
+    counts = Mood.objects.values('mood_type').annotate(n=Count('id')).order_by()
+    MoodTypeCounter.objects.bulk_create([
+        MoodTypeCounter(mood_type=row['mood_type'], count=row['n']) for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_mood_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodTypeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mood_type', models.CharField(choices=[('happy', 'Happy'), ('sad', 'Sad'), ('anxious', 'Anxious'), ('angry', 'Angry'), ('calm', 'Calm'), ('tired', 'Tired')], max_length=20, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing_moods, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0009_monthlyreport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suggestion',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
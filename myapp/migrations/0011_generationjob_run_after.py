@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_suggestion_stale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='run_after',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Mood(models.Model):
     MOOD_CHOICES = [
@@ -16,5 +17,144 @@ class Mood(models.Model):
     mood_type = models.CharField(max_length=20, choices=MOOD_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # "this user's entries, newest first" and date-range filters
+            models.Index(fields=['user', 'created_at']),
+            # per-mood-type counts and filters within a date range
+            models.Index(fields=['user', 'mood_type', 'created_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Derived rows written by the signals go in the same transaction as the entry
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.mood_type}"
+
+
+class Suggestion(models.Model):
+    """AI suggestion generated once for a Mood entry and served from the DB afterwards"""
+    mood = models.OneToOneField(Mood, on_delete=models.CASCADE, related_name='suggestion')
+    text = models.TextField()
+    # "Try a different suggestion" was pressed: keep serving this text until a new one is saved
+    stale = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Suggestion for {self.mood}"
+
+
+class DailyWisdom(models.Model):
+    """Pre-generated daily quote, written nightly by `manage.py generate_daily_wisdom`"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_wisdom')
+    date = models.DateField()
+    mood_type = models.CharField(max_length=20, choices=Mood.MOOD_CHOICES)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'mood_type'], name='unique_daily_wisdom'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} ({self.mood_type})"
+
+
+class GenerationJob(models.Model):
+    """Queued LLM work for a saved Mood, drained by `manage.py run_generation_worker`"""
+    KIND_CHOICES = [
+        ("suggestion", "Suggestion"),
+        ("playlist", "Playlist description"),
+        ("challenges", "Mindful challenges"),
+    ]
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    mood = models.ForeignKey(Mood, on_delete=models.CASCADE, related_name='generation_jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # A failed attempt is retried no sooner than this (see GENERATION_JOB_RETRY_SECONDS)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for mood {self.mood_id} ({self.status})"
+
+
+class MoodDailyRollup(models.Model):
+    """Per-user, per-day mood counts kept in step with Mood by the signals in myapp/signals.py"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    happy = models.PositiveIntegerField(default=0)
+    sad = models.PositiveIntegerField(default=0)
+    anxious = models.PositiveIntegerField(default=0)
+    angry = models.PositiveIntegerField(default=0)
+    calm = models.PositiveIntegerField(default=0)
+    tired = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    first_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_mood_daily_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} ({self.total})"
+
+
+class MoodTypeCounter(models.Model):
+    """Site-wide number of entries per mood type, kept current by the Mood signals"""
+    mood_type = models.CharField(max_length=20, choices=Mood.MOOD_CHOICES, unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.mood_type}: {self.count}"
+
+
+class MonthlyReport(models.Model):
+    """Parsed AI analysis of a user's month, reused while the month's entries are unchanged"""
+    KIND_CHOICES = [
+        ("monthly_analysis", "Monthly analysis"),
+        ("wellness_analytics", "Wellness analytics"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_reports')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    # sha256 of the month's entry ids and timestamps when the report was generated
+    content_hash = models.CharField(max_length=64)
+    sections = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year', 'month', 'kind'], name='unique_monthly_report'),
+        ]
+
     def __str__(self):
-        return f"{self.user.username} - {self.mood_type}"
\ No newline at end of file
+        return f"{self.user.username} - {self.kind} {self.year}-{self.month:02d}"
@@ -0,0 +1,91 @@
+"""
+Keyset (cursor) pagination over (created_at, id).
+
+Instead of OFFSET, each page remembers the last row it showed and the next
+page asks for rows past it, so a deep page costs the same as the first one
+and no COUNT(*) is needed. Cursors are opaque URL-safe tokens.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of rows plus the cursors to move forwards and backwards"""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.object_list = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def encode_cursor(obj):
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """(created_at, pk) from a cursor token, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created_at, pk = raw.split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _past(position, descending):
+    """Rows that come after `position` in the given ordering"""
+    created_at, pk = position
+    if descending:
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+
+
+def paginate(queryset, per_page, after=None, before=None, descending=True):
+    """
+    One page of `queryset` ordered by (created_at, id), in a single query.
+
+    `after` continues from a page's next_cursor, `before` goes back from a
+    page's previous_cursor; with neither, the first page is returned.
+    """
+    before = decode_cursor(before)
+    after = decode_cursor(after) if before is None else None
+
+    if before is not None:
+        # Walk backwards from the cursor, then restore the display order
+        ordering = ('created_at', 'pk') if descending else ('-created_at', '-pk')
+        rows = list(queryset.filter(_past(before, not descending)).order_by(*ordering)[:per_page + 1])
+        has_more = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            previous_cursor=encode_cursor(items[0]) if items and has_more else None,
+        )
+
+    ordering = ('-created_at', '-pk') if descending else ('created_at', 'pk')
+    if after is not None:
+        queryset = queryset.filter(_past(after, descending))
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    items = rows[:per_page]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1]) if len(rows) > per_page else None,
+        previous_cursor=encode_cursor(items[0]) if items and after is not None else None,
+    )
@@ -0,0 +1,324 @@
+"""
+Model backends behind the LLM gateway (see llm.py), chosen with LLM_PROVIDER.
+
+'gemini' talks to Google's Gemini API. 'fake' answers locally: every feature
+gets a well-formed response in the format its view parses, after a latency
+drawn from a configurable distribution, and a configurable share of calls
+fail. It needs no network or API key, so load tests, benchmarks and CI can
+exercise the real gateway, caches and fallbacks against a slow or flaky model.
+A dotted path to a Provider subclass with a from_settings() classmethod works too.
+"""
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class Provider(ABC):
+    """A model backend: text in, text (or text chunks) out"""
+
+    name = 'provider'
+
+    @classmethod
+    def from_settings(cls):
+        return cls()
+
+    @abstractmethod
+    def generate(self, feature, prompt, timeout, json_mode=False):
+        """Return the full response text; any exception counts as a failed call"""
+
+    def stream(self, feature, prompt, timeout):
+        """Yield response text chunks; backends without streaming send it in one piece"""
+        yield self.generate(feature, prompt, timeout)
+
+
+class GeminiProvider(Provider):
+    """Google Gemini through the google-generativeai client"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(settings.GEMINI_API_KEY, settings.GEMINI_MODEL)
+
+    @property
+    def model(self):
+        # Configure the client lazily so importing views never touches the network
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, feature, prompt, timeout, json_mode=False):
+        # json_mode asks Gemini for an application/json response
+        generation_config = {"response_mime_type": "application/json"} if json_mode else None
+        response = self.model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            request_options={"timeout": timeout},
+        )
+        return response.text
+
+    def stream(self, feature, prompt, timeout):
+        response = self.model.generate_content(
+            prompt,
+            stream=True,
+            request_options={"timeout": timeout},
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeProviderError(Exception):
+    """A failure injected by FakeProvider's error rate"""
+
+
+class FakeProvider(Provider):
+    """
+    Local stand-in for the model with simulated latency and failures.
+
+    `latency` maps a feature (or 'default') to a distribution, e.g.
+    {'distribution': 'lognormal', 'median': 0.8, 'sigma': 0.5}. The answer
+    text depends only on (seed, feature, prompt); latencies and injected
+    errors come from one seeded generator, so a run that makes the same calls
+    in the same order sees the same delays and failures.
+    """
+
+    name = 'fake'
+    STREAM_CHUNK_CHARS = 40
+
+    def __init__(self, latency=None, error_rate=0.0, seed=0, latency_scale=1.0, sleep=time.sleep):
+        self.latency = latency or {}
+        for spec in self.latency.values():
+            _draw(random.Random(0), spec)
+        self.error_rate = error_rate
+        self.seed = seed
+        self.latency_scale = latency_scale
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            latency=settings.LLM_FAKE_LATENCY,
+            error_rate=settings.LLM_FAKE_ERROR_RATE,
+            seed=settings.LLM_FAKE_SEED,
+            latency_scale=settings.LLM_FAKE_LATENCY_SCALE,
+        )
+
+    def _plan(self, feature):
+        """(seconds this call takes, whether it fails)"""
+        spec = self.latency.get(feature, self.latency.get('default', {'distribution': 'fixed', 'seconds': 0}))
+        with self._lock:
+            seconds = _draw(self._random, spec) * self.latency_scale
+            fails = self._random.random() < self.error_rate
+        return seconds, fails
+
+    def _wait(self, seconds, timeout, feature):
+        # Never sleep past the caller's deadline: give up there like a real client would
+        if seconds > timeout:
+            self._sleep(max(timeout, 0))
+            raise TimeoutError(f"fake {feature} response took {seconds:.2f}s")
+        self._sleep(seconds)
+
+    def generate(self, feature, prompt, timeout, json_mode=False):
+        seconds, fails = self._plan(feature)
+        self._wait(seconds, timeout, feature)
+        if fails:
+            raise FakeProviderError(f"injected {feature} failure")
+        return self.respond(feature, prompt)
+
+    def stream(self, feature, prompt, timeout):
+        seconds, fails = self._plan(feature)
+        text = self.respond(feature, prompt)
+        chunks = [text[i:i + self.STREAM_CHUNK_CHARS] for i in range(0, len(text), self.STREAM_CHUNK_CHARS)]
+
+        # A third of the time goes to the first chunk, the rest is spread over the others
+        first = seconds / 3
+        step = (seconds - first) / max(len(chunks) - 1, 1)
+        self._wait(first, timeout, feature)
+        elapsed = first
+        for index, chunk in enumerate(chunks):
+            if index:
+                self._wait(step, timeout - elapsed, feature)
+                elapsed += step
+            if fails and index >= len(chunks) // 2:
+                raise FakeProviderError(f"injected {feature} failure mid-stream")
+            yield chunk
+
+    def respond(self, feature, prompt):
+        """A well-formed answer for the feature, the same for the same prompt"""
+        key = hashlib.sha256(f"{self.seed}\x1f{feature}\x1f{prompt}".encode('utf-8')).hexdigest()
+        rng = random.Random(key)
+        build = _RESPONSES.get(feature, _generic)
+        return build(rng)
+
+
+def _draw(rng, spec):
+    kind = spec.get('distribution', 'fixed')
+    if kind == 'fixed':
+        return float(spec.get('seconds', 0))
+    if kind == 'uniform':
+        return rng.uniform(spec['low'], spec['high'])
+    if kind == 'normal':
+        return max(rng.gauss(spec['mean'], spec['stddev']), 0.0)
+    if kind == 'lognormal':
+        # median and sigma are easier to reason about than mu: half the calls beat the median
+        return rng.lognormvariate(math.log(spec['median']), spec['sigma'])
+    raise ImproperlyConfigured(f"Unknown fake LLM latency distribution {kind!r}")
+
+
+_QUOTES = [
+    "Even on quiet days, your strength is growing.",
+    "Breathe in gently; you are allowed to go slowly.",
+    "Every small step forward still moves you forward.",
+    "Your feelings are visitors, and you are the calm home they pass through.",
+]
+
+_CHALLENGES = [
+    ("🧘", "Mindful Breathing", "Take five slow breaths and notice how your body softens."),
+    ("🚶", "Gentle Walk", "Step outside for ten minutes and name three things you see."),
+    ("📝", "Gratitude Note", "Write down one small thing that went well today."),
+    ("💧", "Hydration Pause", "Drink a glass of water slowly and check in with yourself."),
+    ("🌙", "Screen Sunset", "Put your phone away thirty minutes before bed tonight."),
+]
+
+_PLAYLISTS = [
+    ("🌊", "Calm Waters", "Soft, steady songs to slow your breathing and quiet your mind.",
+     [("Weightless", "Marconi Union"), ("Holocene", "Bon Iver"), ("Gymnopédie No. 1", "Erik Satie")]),
+    ("☀️", "Sunny Start", "Bright melodies to lift your energy and your mood.",
+     [("Here Comes the Sun", "The Beatles"), ("Walking on Sunshine", "Katrina and the Waves"),
+      ("Good as Hell", "Lizzo")]),
+    ("🌙", "Night Unwind", "Gentle tracks to help you let go of the day.",
+     [("Night Owl", "Galimatias"), ("Sunset Lover", "Petit Biscuit"), ("Clair de Lune", "Claude Debussy")]),
+    ("💪", "Quiet Strength", "Songs that remind you how much you have already carried.",
+     [("Rise Up", "Andra Day"), ("Fix You", "Coldplay"), ("Unwritten", "Natasha Bedingfield")]),
+    ("🌿", "Fresh Air", "Light, open sounds for a clear head and an easy heart.",
+     [("Banana Pancakes", "Jack Johnson"), ("Riptide", "Vance Joy"), ("Bloom", "The Paper Kites")]),
+    ("🌈", "Mood Lifter", "Hopeful songs that gently shift your perspective.",
+     [("Three Little Birds", "Bob Marley"), ("Lovely Day", "Bill Withers"), ("Dog Days Are Over", "Florence + The Machine")]),
+]
+
+_SENTENCES = [
+    "Your entries show a mix of heavier and lighter moments.",
+    "Calm days tend to follow the times you made space for rest.",
+    "Tiredness appears often, which may be a sign to protect your sleep.",
+    "You keep returning to journaling, and that steadiness matters.",
+    "Moments of worry were usually followed by a calmer day.",
+    "There is real care in how honestly you describe your feelings.",
+]
+
+
+def _pick(rng, items, count):
+    return rng.sample(items, count)
+
+
+def _wisdom(rng):
+    return rng.choice(_QUOTES)
+
+
+def _suggestion(rng):
+    return " ".join(_pick(rng, _SENTENCES, 2)) + " Try a slow stretch and a few deep breaths 🌸💙"
+
+
+def _playlist(rng):
+    return " ".join(_pick(rng, _SENTENCES, 2)) + " Let this music keep you gentle company 🎶"
+
+
+def _challenges(rng):
+    return "\n\n".join(
+        f"emoji: {emoji}\ntitle: {title}\ndescription: {description}"
+        for emoji, title, description in _pick(rng, _CHALLENGES, 3)
+    )
+
+
+def _mood_playlists(rng):
+    return "\n\n".join(
+        f"emoji: {emoji}\ntitle: {title}\ndescription: {description}\ntracks:\n"
+        + "\n".join(f"- {song} - {artist}" for song, artist in tracks)
+        for emoji, title, description, tracks in _pick(rng, _PLAYLISTS, 5)
+    )
+
+
+def _daily_bundle(rng):
+    return json.dumps({
+        'wisdom': _wisdom(rng),
+        'challenges': [
+            {'emoji': emoji, 'title': title, 'description': description}
+            for emoji, title, description in _pick(rng, _CHALLENGES, 3)
+        ],
+        'playlist_description': _playlist(rng),
+    }, ensure_ascii=False)
+
+
+def _monthly_analysis(rng):
+    patterns = "\n".join(f"- {s}" for s in _pick(rng, _SENTENCES, 3))
+    suggestions = "\n".join(f"- {title}: {description}" for _, title, description in _pick(rng, _CHALLENGES, 3))
+    return (
+        f"Mood Overview:\n{' '.join(_pick(rng, _SENTENCES, 2))}\n\n"
+        f"Patterns Observed:\n{patterns}\n\n"
+        f"Emotional Insight:\n{' '.join(_pick(rng, _SENTENCES, 2))}\n\n"
+        f"Gentle Suggestions:\n{suggestions}\n"
+    )
+
+
+def _wellness_analytics(rng):
+    return "\n\n".join(
+        f"{heading}:\n{' '.join(_pick(rng, _SENTENCES, 2))}"
+        for heading in ("EMOTIONAL SUMMARY", "MOOD PATTERNS", "EMOTIONAL INSIGHT", "GENTLE SUGGESTIONS")
+    )
+
+
+def _week_summary(rng):
+    return " ".join(_pick(rng, _SENTENCES, 3))
+
+
+def _generic(rng):
+    return " ".join(_pick(rng, _SENTENCES, 2))
+
+
+_RESPONSES = {
+    'wisdom': _wisdom,
+    'suggestion': _suggestion,
+    'playlist': _playlist,
+    'challenges': _challenges,
+    'mood_playlists': _mood_playlists,
+    'daily_bundle': _daily_bundle,
+    'monthly_analysis': _monthly_analysis,
+    'wellness_analytics': _wellness_analytics,
+    'week_summary': _week_summary,
+}
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'fake': FakeProvider,
+}
+
+
+def from_settings():
+    """Build the provider named by LLM_PROVIDER"""
+    name = settings.LLM_PROVIDER
+    try:
+        provider_class = PROVIDERS.get(name) or import_string(name)
+    except ImportError as exc:
+        raise ImproperlyConfigured(f"LLM_PROVIDER {name!r} is not a known provider or importable class") from exc
+    return provider_class.from_settings()
@@ -0,0 +1,79 @@
+"""
+Saved monthly AI reports (MonthlyReport).
+
+A report is stored with a hash of the ids and timestamps of the entries it
+was generated from. While that hash still matches, the views serve the saved
+sections instead of calling the model; a new or deleted entry changes the
+hash, and editing an entry drops the month's reports (see signals.py).
+"""
+import hashlib
+
+from django.utils import timezone
+
+from . import ledger
+from .models import Mood, MonthlyReport
+
+
+def _entries(user, start, end):
+    return (
+        Mood.objects.filter(user=user, created_at__gte=start, created_at__lt=end)
+        .order_by('pk')
+        .values_list('pk', 'created_at')
+    )
+
+
+def _hash(rows):
+    digest = hashlib.sha256()
+    for pk, created_at in rows:
+        digest.update(f"{pk}|{created_at.isoformat()};".encode())
+    return digest.hexdigest()
+
+
+def _period(start):
+    start = timezone.localtime(start)
+    return {'year': start.year, 'month': start.month}
+
+
+def lookup(user, kind, start, end):
+    """(saved sections or None, current content hash) for the month [start, end)"""
+    content_hash = _hash(_entries(user, start, end))
+    sections = (
+        MonthlyReport.objects.filter(user=user, kind=kind, content_hash=content_hash, **_period(start))
+        .values_list('sections', flat=True)
+        .first()
+    )
+    if sections is not None:
+        ledger.record(kind, 'ok', cache='hit')
+    return sections, content_hash
+
+
+def store(user, kind, start, content_hash, sections):
+    MonthlyReport.objects.update_or_create(
+        user=user, kind=kind, **_period(start),
+        defaults={'content_hash': content_hash, 'sections': sections},
+    )
+
+
+async def alookup(user, kind, start, end):
+    """Async version of lookup()"""
+    content_hash = _hash([row async for row in _entries(user, start, end)])
+    sections = await (
+        MonthlyReport.objects.filter(user=user, kind=kind, content_hash=content_hash, **_period(start))
+        .values_list('sections', flat=True)
+        .afirst()
+    )
+    if sections is not None:
+        ledger.record(kind, 'ok', cache='hit')
+    return sections, content_hash
+
+
+async def astore(user, kind, start, content_hash, sections):
+    await MonthlyReport.objects.aupdate_or_create(
+        user=user, kind=kind, **_period(start),
+        defaults={'content_hash': content_hash, 'sections': sections},
+    )
+
+
+def invalidate(user_id, moment):
+    """Drop the reports for the month containing `moment` (an entry in it was edited)"""
+    MonthlyReport.objects.filter(user_id=user_id, **_period(moment)).delete()
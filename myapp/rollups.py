@@ -0,0 +1,167 @@
+"""
+Per-user daily mood rollups (MoodDailyRollup).
+
+Saving a Mood bumps its day's counters with F() expressions; editing or
+deleting one recounts that single day. The analytics views read these rows
+instead of scanning Mood, so their cost grows with days tracked rather than
+entries written. `manage.py backfill_mood_rollups` rebuilds them from scratch.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import Greatest, Least, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .dates import day_bounds
+from .models import Mood, MoodDailyRollup
+
+MOOD_TYPES = [code for code, _ in Mood.MOOD_CHOICES]
+
+# How bucketed() groups days
+BUCKETS = {
+    'day': lambda field: F(field),
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def day_of(moment):
+    """The local calendar day a mood belongs to"""
+    return timezone.localdate(moment)
+
+
+def _counts():
+    counts = {mood_type: Count('id', filter=Q(mood_type=mood_type)) for mood_type in MOOD_TYPES}
+    counts.update(total=Count('id'), first_at=Min('created_at'), last_at=Max('created_at'))
+    return counts
+
+
+def record_mood(mood):
+    """Add a newly created mood to its day's rollup"""
+    day = day_of(mood.created_at)
+    increments = {'total': F('total') + 1}
+    if mood.mood_type in MOOD_TYPES:
+        increments[mood.mood_type] = F(mood.mood_type) + 1
+
+    row = MoodDailyRollup.objects.filter(user_id=mood.user_id, date=day)
+
+    def bump():
+        return row.update(
+            first_at=Least('first_at', mood.created_at),
+            last_at=Greatest('last_at', mood.created_at),
+            **increments,
+        )
+
+    # Write first, no read: the day's row usually exists already
+    if bump():
+        return
+    try:
+        with transaction.atomic():
+            MoodDailyRollup.objects.create(
+                user_id=mood.user_id, date=day,
+                total=1, first_at=mood.created_at, last_at=mood.created_at,
+                **({mood.mood_type: 1} if mood.mood_type in MOOD_TYPES else {}),
+            )
+    except IntegrityError:
+        # Another transaction created the day's row in the meantime
+        bump()
+
+
+def rebuild_day(user_id, day):
+    """Recount one day from Mood; the row is removed when the day has no entries left"""
+    start, end = day_bounds(day)
+    with transaction.atomic():
+        counts = Mood.objects.filter(
+            user_id=user_id, created_at__gte=start, created_at__lt=end
+        ).aggregate(**_counts())
+        if not counts['total']:
+            MoodDailyRollup.objects.filter(user_id=user_id, date=day).delete()
+            return
+        MoodDailyRollup.objects.update_or_create(user_id=user_id, date=day, defaults=counts)
+
+
+def rebuild(users=None):
+    """Rebuild every rollup row (or those of the given users) with one GROUP BY; returns rows written"""
+    moods = Mood.objects.all()
+    rollups = MoodDailyRollup.objects.all()
+    if users is not None:
+        moods = moods.filter(user__in=users)
+        rollups = rollups.filter(user__in=users)
+
+    rows = (
+        moods.annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(**_counts())
+        .order_by()
+    )
+    # INSERT ... SELECT, so millions of grouped rows never pass through Python.
+    # The SELECT lists user_id, day, then the counts in _counts() order.
+    sql, params = rows.query.sql_with_params()
+    columns = [
+        MoodDailyRollup._meta.get_field(name).column
+        for name in ['user', 'date', *_counts()]
+    ]
+    quote = connection.ops.quote_name
+    insert = f"INSERT INTO {quote(MoodDailyRollup._meta.db_table)} ({', '.join(map(quote, columns))}) {sql}"
+
+    with transaction.atomic():
+        rollups.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(insert, params)
+            return cursor.rowcount
+
+
+def totals(user, start=None, end=None):
+    """Per-mood counts plus 'total' for the user, optionally only for days in [start, end)"""
+    rollups = MoodDailyRollup.objects.filter(user=user)
+    if start is not None:
+        rollups = rollups.filter(date__gte=start)
+    if end is not None:
+        rollups = rollups.filter(date__lt=end)
+    sums = rollups.aggregate(total=Sum('total'), **{mood_type: Sum(mood_type) for mood_type in MOOD_TYPES})
+    return {key: value or 0 for key, value in sums.items()}
+
+
+def entries_since(user, **starts):
+    """Entry counts since each given day, in one query: entries_since(user, month=d1, week=d2)"""
+    sums = MoodDailyRollup.objects.filter(user=user).aggregate(**{
+        name: Sum('total', filter=Q(date__gte=start)) for name, start in starts.items()
+    })
+    return {key: value or 0 for key, value in sums.items()}
+
+
+def summary(user, **starts):
+    """totals() for all time plus entries_since() for each given day, from one conditional aggregate"""
+    sums = MoodDailyRollup.objects.filter(user=user).aggregate(
+        # The windows come first: after the 'total' alias exists, 'total' would refer to it
+        **{name: Sum('total', filter=Q(date__gte=start)) for name, start in starts.items()},
+        total=Sum('total'),
+        **{mood_type: Sum(mood_type) for mood_type in MOOD_TYPES},
+    )
+    return {key: value or 0 for key, value in sums.items()}
+
+
+def bucketed(user, start, end, bucket='day'):
+    """
+    Per-mood counts and 'total' per day, week or month for days in [start, end).
+
+    Grouped in SQL over the daily rollups; returns one dict per non-empty
+    period ({'period': date, 'total': n, 'happy': n, ...}), oldest first.
+    """
+    fields = ['total', *MOOD_TYPES]
+    rows = (
+        MoodDailyRollup.objects.filter(user=user, date__gte=start, date__lt=end)
+        .annotate(period=BUCKETS[bucket]('date'))
+        .values('period')
+        # Aliases can't reuse the field names, so they're renamed below
+        .annotate(**{f"sum_{field}": Sum(field) for field in fields})
+        .order_by('period')
+    )
+    return [
+        {'period': row['period'], **{field: row[f"sum_{field}"] for field in fields}}
+        for row in rows
+    ]
+
+
+def distribution(counts):
+    """{mood_type: count} for the mood types that actually occur"""
+    return {mood_type: counts[mood_type] for mood_type in MOOD_TYPES if counts.get(mood_type)}
@@ -0,0 +1,65 @@
+"""
+Keeps derived data in step with Mood: daily rollups, the site-wide mood type
+counters and saved monthly reports. Connected in MyappConfig.ready().
+Mood.save()/delete() run these receivers inside the entry's own transaction,
+so an entry and its derived rows are written together or not at all.
+
+Bulk operations (bulk_create, QuerySet.update) skip these signals; run
+`manage.py backfill_mood_rollups` after them.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import distribution, reports, rollups
+from .models import Mood
+
+
+@receiver(post_save, sender=Mood, dispatch_uid='mood_rollup_on_save')
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        # loaddata: fixtures are rolled up by the backfill command
+        return
+    if created:
+        rollups.record_mood(instance)
+    else:
+        # mood_type may have changed, so recount the whole day
+        rollups.rebuild_day(instance.user_id, rollups.day_of(instance.created_at))
+
+
+@receiver(post_delete, sender=Mood, dispatch_uid='mood_rollup_on_delete')
+def update_rollup_on_delete(sender, instance, **kwargs):
+    rollups.rebuild_day(instance.user_id, rollups.day_of(instance.created_at))
+
+
+@receiver(pre_save, sender=Mood, dispatch_uid='mood_counter_remember_type')
+def remember_previous_mood_type(sender, instance, raw=False, **kwargs):
+    # The counters need to know which type an edited entry is moving away from
+    instance._previous_mood_type = None
+    if instance.pk and not raw:
+        instance._previous_mood_type = (
+            Mood.objects.filter(pk=instance.pk).values_list('mood_type', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Mood, dispatch_uid='mood_counter_on_save')
+def update_counter_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_mood_type', None)
+    if created or previous is None:
+        distribution.adjust(instance.mood_type, 1)
+    elif previous != instance.mood_type:
+        distribution.adjust(previous, -1)
+        distribution.adjust(instance.mood_type, 1)
+
+
+@receiver(post_save, sender=Mood, dispatch_uid='mood_report_on_edit')
+def drop_reports_on_edit(sender, instance, created, raw=False, **kwargs):
+    # New and deleted entries change the report hash; edits keep ids and timestamps
+    if not created and not raw:
+        reports.invalidate(instance.user_id, instance.created_at)
+
+
+@receiver(post_delete, sender=Mood, dispatch_uid='mood_counter_on_delete')
+def update_counter_on_delete(sender, instance, **kwargs):
+    distribution.adjust(instance.mood_type, -1)
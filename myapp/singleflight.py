@@ -0,0 +1,108 @@
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key at once, only the first (the
+leader) does the work; the others wait for it and share its result or its
+exception. do() covers threads (sync views, worker pools) and ado() covers
+coroutines running on an event loop. A caller that wants to know whether its
+call joined another one sets `joined` to a dict; followers mark it
+{'coalesced': True}. The dict is shared with the worker threads the leader
+starts, since they get a copy of the caller's context.
+
+The two paths keep separate counters. An ado() leader usually runs do() in a
+thread (LLMGateway.agenerate does), so adding them up would count that call twice.
+"""
+import asyncio
+import threading
+from contextvars import ContextVar
+
+joined = ContextVar('singleflight_joined', default=None)
+
+
+def _mark_follower():
+    note = joined.get()
+    if note is not None:
+        note['coalesced'] = True
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.async_calls = 0
+        self.async_coalesced = 0
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() once per key among concurrent callers; TimeoutError if a follower waits too long"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            _mark_follower()
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"gave up waiting for in-flight call {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key, coro_fn, timeout=None):
+        """Await coro_fn() once per key among concurrent coroutines on the running loop"""
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = loop.create_task(coro_fn())
+                task.add_done_callback(lambda t: self._forget(task_key, t))
+                self.async_calls += 1
+            else:
+                self.async_coalesced += 1
+                _mark_follower()
+
+        # shield() so one caller timing out or disconnecting doesn't cancel the shared call
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def _forget(self, task_key, task):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+        # Mark the exception as seen even if every waiter already gave up
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+                'async_calls': self.async_calls,
+                'async_coalesced': self.async_coalesced,
+                'async_in_flight': len(self._tasks),
+            }
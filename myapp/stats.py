@@ -0,0 +1,10 @@
+"""
+Summary statistics shared by the management commands (loadtest, llm_ledger_report).
+"""
+import math
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
@@ -0,0 +1,47 @@
+"""
+Journaling streaks, shared by every page that shows one.
+
+A streak counts consecutive calendar days with at least one entry, however
+many entries a day has. The current streak is still alive until today ends,
+so a run that stopped yesterday counts. Days come from MoodDailyRollup: one
+indexed query, one row per day. It isn't cached, since a per-process cache
+can't be cleared in the other workers when an entry is saved.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import MoodDailyRollup
+
+Streak = namedtuple('Streak', ['current', 'longest'])
+
+
+def compute(days, today):
+    """Current and longest streak from distinct entry dates sorted newest first"""
+    runs = []
+    previous = None
+    for day in days:
+        if previous is not None and day == previous - timedelta(days=1):
+            runs[-1] += 1
+        else:
+            runs.append(1)
+        previous = day
+
+    if not runs:
+        return Streak(0, 0)
+    # The newest run is the current one, unless it ended before yesterday
+    current = runs[0] if days[0] >= today - timedelta(days=1) else 0
+    return Streak(current, max(runs))
+
+
+def for_user(user, today=None):
+    """Streak for a user (or user id)"""
+    user_id = getattr(user, 'pk', user)
+    today = today or timezone.localdate()
+    days = list(
+        MoodDailyRollup.objects.filter(user_id=user_id, date__lte=today)
+        .order_by('-date')
+        .values_list('date', flat=True)
+    )
+    return compute(days, today)
@@ -0,0 +1,125 @@
+"""
+Token-budgeted mood digests for the monthly prompts.
+
+A month of entries goes into the prompt as-is while it fits the token
+budget. Above it, each calendar week is summarized on its own (map, all
+weeks at once) and the monthly prompt is built from those summaries
+(reduce). Week summaries are cached under a hash of the week's entries, so
+a later analysis in the same month only re-summarizes the week that changed.
+"""
+import asyncio
+import contextvars
+import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import llm, llm_cache
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def entry_line(mood):
+    return f"- {mood.mood_type}: {mood.note}"
+
+
+def weeks(moods):
+    """[(monday, [moods...]), ...] oldest week first, entries oldest first"""
+    by_week = {}
+    for mood in sorted(moods, key=lambda m: (m.created_at, m.pk)):
+        day = timezone.localdate(mood.created_at)
+        by_week.setdefault(day - timedelta(days=day.weekday()), []).append(mood)
+    return sorted(by_week.items())
+
+
+def week_prompt(monday, moods):
+    entries = "\n".join(entry_line(m) for m in moods)
+    return f"""You are a gentle mental wellness assistant. Summarize this person's journal entries
+for the week of {monday:%B %d} in 3-4 sentences: the moods that dominated, how they shifted during
+the week, and any situations or feelings they kept coming back to.
+
+Entries (oldest first):
+{entries}
+
+Write only the summary, in the third person, warm and non-judgmental."""
+
+
+def _week_key(username, monday, moods):
+    content = hashlib.sha256(
+        "\x1f".join(f"{m.pk}|{m.created_at.isoformat()}|{m.mood_type}|{m.note}" for m in moods).encode('utf-8')
+    ).hexdigest()
+    return {'username': username, 'extra': monday.isoformat(), 'note': content}
+
+
+def _week_fallback(monday, moods):
+    """Counts only, for a week whose summary couldn't be generated"""
+    counts = Counter(m.mood_type for m in moods)
+    spread = ", ".join(f"{n} {mood_type}" for mood_type, n in counts.most_common())
+    return f"{len(moods)} entries ({spread})"
+
+
+def _format(summaries):
+    return "\n".join(f"Week of {monday:%B %d}: {summary}" for monday, summary in summaries)
+
+
+def _needs_summaries(raw):
+    return estimate_tokens(raw) > settings.LLM_PROMPT_TOKEN_BUDGET
+
+
+def summarize_week(username, monday, moods):
+    try:
+        return llm_cache.get_cache().get_or_generate(
+            'week_summary',
+            lambda: llm.generate('week_summary', week_prompt(monday, moods)).strip(),
+            **_week_key(username, monday, moods),
+        ) or _week_fallback(monday, moods)
+    except llm.LLMError:
+        return _week_fallback(monday, moods)
+
+
+async def asummarize_week(username, monday, moods):
+    async def produce():
+        return (await llm.agenerate('week_summary', week_prompt(monday, moods))).strip()
+
+    try:
+        return await llm_cache.get_cache().aget_or_generate(
+            'week_summary', produce, **_week_key(username, monday, moods),
+        ) or _week_fallback(monday, moods)
+    except llm.LLMError:
+        return _week_fallback(monday, moods)
+
+
+def digest(moods, username):
+    """The month's entries for a prompt: raw lines under the token budget, weekly summaries above it"""
+    moods = list(moods)
+    raw = "\n".join(entry_line(m) for m in sorted(moods, key=lambda m: (m.created_at, m.pk)))
+    if not _needs_summaries(raw):
+        return raw
+
+    grouped = weeks(moods)
+    # The gateway's concurrency limit still applies on top of this pool
+    # Each week runs in a copy of this thread's context, so request timing still sees its LLM call
+    contexts = [contextvars.copy_context() for _ in grouped]
+    with ThreadPoolExecutor(max_workers=min(len(grouped), settings.LLM_MAX_CONCURRENCY)) as pool:
+        summaries = list(pool.map(
+            lambda context, week: context.run(summarize_week, username, *week), contexts, grouped
+        ))
+    return _format(zip([monday for monday, _ in grouped], summaries))
+
+
+async def adigest(moods, username):
+    """Async version of digest(); the weeks are summarized with asyncio.gather"""
+    moods = list(moods)
+    raw = "\n".join(entry_line(m) for m in sorted(moods, key=lambda m: (m.created_at, m.pk)))
+    if not _needs_summaries(raw):
+        return raw
+
+    grouped = weeks(moods)
+    summaries = await asyncio.gather(*(asummarize_week(username, *week) for week in grouped))
+    return _format(zip([monday for monday, _ in grouped], summaries))
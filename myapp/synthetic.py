@@ -0,0 +1,120 @@
+"""
+Synthetic mood histories for `manage.py seed_moods`.
+
+Users journal in streaks: a day with entries is usually followed by another
+one, and a gap tends to last a while. Everyone has their own mood mix and
+moods run on from one entry to the next. Notes range from empty to a few
+paragraphs. There are no Django imports here, so worker processes start
+quickly, and each user's rows depend only on (seed, user index): the output
+is the same whatever the number of workers.
+"""
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+MOOD_WEIGHTS = {
+    'happy': 22,
+    'calm': 20,
+    'tired': 20,
+    'sad': 15,
+    'anxious': 15,
+    'angry': 8,
+}
+
+# Chance that a day with entries is followed by another one (streak length ~ 1 / (1 - p))
+STAY_ACTIVE = 0.85
+
+# Chance an entry repeats the previous entry's mood
+MOOD_CARRYOVER = 0.4
+
+ENTRIES_PER_DAY = [(1, 0.7), (2, 0.2), (3, 0.1)]
+
+# Entries cluster in the morning and the evening
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 9, 6, 4, 4, 5, 4, 3, 3, 4, 5, 7, 9, 11, 12, 10, 5]
+
+EMPTY_NOTE_SHARE = 0.1
+
+COMMON_WORDS = (
+    "today work sleep friend family walk coffee morning evening night class meeting "
+    "phone music dinner lunch weekend rain sun tea book exam project call deadline "
+    "gym home bus train city room window garden dog cat message time week".split()
+)
+
+MOOD_WORDS = {
+    'happy': "laughed great grateful bright proud fun lovely excited good smile".split(),
+    'calm': "quiet peaceful slow gentle breathing rested steady soft easy relaxed".split(),
+    'tired': "exhausted drained sleepy heavy slow foggy late yawning worn long".split(),
+    'sad': "lonely missing tears low empty down quiet grey lost hurt".split(),
+    'anxious': "worried nervous racing tense restless overthinking pressure uneasy panic stuck".split(),
+    'angry': "frustrated annoyed unfair shouted irritated furious argument tense rude snapped".split(),
+}
+
+
+def quotas(seed, users, moods):
+    """Entries per user: a few heavy journalers, many light ones, `moods` in total"""
+    rng = random.Random(f"{seed}:quotas")
+    weights = [rng.lognormvariate(0, 0.8) for _ in range(users)]
+    total = sum(weights)
+    counts = [int(moods * weight / total) for weight in weights]
+    # Hand the rounding remainder to the first users so the total is exact
+    for index in range(moods - sum(counts)):
+        counts[index % users] += 1
+    return counts
+
+
+def note(rng, mood_type):
+    if rng.random() < EMPTY_NOTE_SHARE:
+        return ""
+    length = min(max(int(rng.lognormvariate(math.log(15), 0.8)), 1), 400)
+    pool = MOOD_WORDS[mood_type]
+    words = [rng.choice(pool) if rng.random() < 0.3 else rng.choice(COMMON_WORDS) for _ in range(length)]
+
+    sentences = []
+    while words:
+        size = rng.randint(6, 14)
+        sentence, words = words[:size], words[size:]
+        sentences.append(" ".join(sentence).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def history(seed, index, quota, days, until):
+    """[(created_at, mood_type, note), ...] on the `days` days before `until`, oldest first, at most `quota` rows"""
+    rng = random.Random(f"{seed}:user:{index}")
+    mean_per_day = sum(n * p for n, p in ENTRIES_PER_DAY)
+    # Heavy journalers write several times as much per active day instead of running out of days
+    multiplier = max(math.ceil(quota / (days * 0.9 * mean_per_day)), 1) if days else 1
+    rate = min(quota / (days * mean_per_day * multiplier), 0.98) if days else 0
+    # Chance of starting again after a gap, so that `rate` is the long-run share of active days
+    stay = max(STAY_ACTIVE, rate)
+    start = min(rate * (1 - stay) / (1 - rate), 1.0)
+
+    moods = list(MOOD_WEIGHTS)
+    weights = [MOOD_WEIGHTS[m] * rng.gammavariate(2, 0.5) for m in moods]
+    counts, count_weights = zip(*ENTRIES_PER_DAY)
+
+    midnight = datetime(until.year, until.month, until.day, tzinfo=timezone.utc)
+    rows = []
+    active = rng.random() < rate
+    mood_type = rng.choices(moods, weights)[0]
+    day = 0
+    while len(rows) < quota and day < days:
+        if active:
+            entries = min(rng.choices(counts, count_weights)[0] * multiplier, quota - len(rows))
+            hours = sorted(rng.choices(range(24), HOUR_WEIGHTS, k=entries), reverse=True)
+            for hour in hours:
+                if rng.random() >= MOOD_CARRYOVER:
+                    mood_type = rng.choices(moods, weights)[0]
+                created_at = midnight - timedelta(days=day + 1) + timedelta(
+                    hours=hour, minutes=rng.randrange(60), seconds=rng.randrange(60))
+                rows.append((created_at, mood_type, note(rng, mood_type)))
+        active = rng.random() < (stay if active else start)
+        day += 1
+
+    rows.reverse()
+    return rows
+
+
+def generate(task):
+    """(index, history(...)) for one (seed, index, quota, days, until) task; used with Pool.imap"""
+    seed, index, quota, days, until = task
+    return index, history(seed, index, quota, days, until)
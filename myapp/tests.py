@@ -1,3 +1,888 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import generation, instrumentation, jobs, ledger, llm, llm_cache, metrics, pagination, rollups, streaks, summarize
+from .circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from .downsample import lttb
+from .generation import MonthlyAnalysisParser, parse_bundle, parse_monthly_analysis
+from .llm_cache import ResponseCache
+from .models import DailyWisdom, GenerationJob, MonthlyReport, Mood, MoodDailyRollup, MoodTypeCounter, Suggestion
+from .providers import FakeProvider, FakeProviderError, Provider
+from .singleflight import SingleFlight, joined
+from .stats import percentile
+from .views import DEFAULT_WISDOM, FALLBACK_CHALLENGES, PLAYLIST_MOOD_DESCRIPTIONS
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def make(self, **kwargs):
+        options = {'max_entries': 2, 'max_bytes': 10_000, 'ttls': {'wisdom': 60}, 'default_ttl': 10}
+        options.update(kwargs)
+        return ResponseCache(**options)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = self.make()
+        cache.set('a', 'wisdom', 'A')
+        cache.set('b', 'wisdom', 'B')
+        cache.get('a')
+        cache.set('c', 'wisdom', 'C')
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), ('A', None, 'C'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_size_limit_evicts_too(self):
+        cache = self.make(max_entries=10, max_bytes=9)
+        cache.set('a', 'wisdom', 'xxxx')
+        cache.set('b', 'wisdom', 'yyyy')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 'yyyy')
+
+    def test_entries_expire_after_their_features_ttl(self):
+        cache = self.make()
+        with mock.patch('myapp.llm_cache.time.time', return_value=1000):
+            cache.set('a', 'wisdom', 'A')
+            cache.set('b', 'other', 'B')
+        with mock.patch('myapp.llm_cache.time.time', return_value=1030):
+            self.assertEqual(cache.get('a'), 'A')
+            self.assertIsNone(cache.get('b'))
+        with mock.patch('myapp.llm_cache.time.time', return_value=1061):
+            self.assertIsNone(cache.get('a'))
+
+    def test_failures_and_empty_answers_are_not_cached(self):
+        cache = self.make()
+        calls = []
+
+        def failing():
+            calls.append(1)
+            raise RuntimeError('model down')
+
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                cache.get_or_generate('wisdom', failing, mood_type='sad')
+        self.assertEqual(cache.get_or_generate('wisdom', lambda: '', mood_type='sad'), '')
+        self.assertEqual(cache.get_or_generate('wisdom', lambda: 'Breathe.', mood_type='sad'), 'Breathe.')
+        self.assertEqual(cache.get_or_generate('wisdom', failing, mood_type='sad'), 'Breathe.')
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(
+    LLM_PROVIDER='fake', LLM_FAKE_LATENCY_SCALE=0, LLM_FAKE_ERROR_RATE=0, LLM_LEDGER_PATH='',
+    LLM_STREAMING_ENABLED=False, GENERATION_QUEUE_ENABLED=False,
+)
+class FakeLLMTestCase(TestCase):
+    """Views against the local fake model with instant answers; the gateway and the response cache start empty"""
+
+    def setUp(self):
+        llm._gateway = None
+        llm_cache.get_cache().clear()
+        self.addCleanup(setattr, llm, '_gateway', None)
+        self.addCleanup(llm_cache.get_cache().clear)
+        self.user = User.objects.create_user('viewer', password='pw')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+
+class SuggestionViewTests(FakeLLMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mood = Mood.objects.create(user=self.user, mood_type='sad', note='long day')
+
+    def test_generated_once_and_reused(self):
+        first = self.client.get('/suggestion/')
+        text = Suggestion.objects.get(mood=self.mood).text
+        self.assertContains(first, text)
+
+        with mock.patch('myapp.llm.generate', side_effect=AssertionError('should be served from the DB')):
+            self.assertContains(self.client.get('/suggestion/'), text)
+
+    def test_regenerate_replaces_the_text(self):
+        Suggestion.objects.create(mood=self.mood, text='Old idea.')
+        response = self.client.post('/suggestion/', {'regenerate': '1'})
+        self.assertRedirects(response, '/suggestion/', fetch_redirect_response=False)
+
+        with mock.patch('myapp.llm.generate', return_value='A fresh idea.'):
+            self.assertContains(self.client.get('/suggestion/'), 'A fresh idea.')
+        suggestion = Suggestion.objects.get(mood=self.mood)
+        self.assertEqual((suggestion.text, suggestion.stale), ('A fresh idea.', False))
+
+    def test_failed_regeneration_keeps_the_old_text(self):
+        Suggestion.objects.create(mood=self.mood, text='Old idea.')
+        self.client.post('/suggestion/', {'regenerate': '1'})
+
+        with mock.patch('myapp.llm.generate', side_effect=llm.LLMError('down')):
+            self.assertContains(self.client.get('/suggestion/'), 'Old idea.')
+        self.assertTrue(Suggestion.objects.get(mood=self.mood).stale)
+
+
+@override_settings(GENERATION_JOB_MAX_ATTEMPTS=2, GENERATION_JOB_RETRY_SECONDS=10)
+class GenerationJobTests(FakeLLMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mood = Mood.objects.create(user=self.user, mood_type='sad', note='long day')
+        [self.job] = jobs.enqueue_for_mood(self.mood, kinds=['suggestion'])
+
+    def status(self):
+        return self.client.get(f'/suggestion/status/{self.mood.id}/').json()
+
+    def test_claimed_job_saves_the_suggestion(self):
+        [job] = jobs.claim(5)
+        self.assertEqual((job.status, job.attempts), ('running', 1))
+        self.assertTrue(jobs.finish_job(job, text='Go for a walk.'))
+        self.assertEqual(self.status(), {'status': 'done', 'suggestion': 'Go for a walk.'})
+
+    def test_failed_job_backs_off_then_fails(self):
+        [job] = jobs.claim(5)
+        self.assertFalse(jobs.finish_job(job, error=llm.LLMError('down')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=5))
+        self.assertEqual(jobs.claim(5), [])
+
+        GenerationJob.objects.filter(id=job.id).update(run_after=timezone.now())
+        [job] = jobs.claim(5)
+        jobs.finish_job(job, error=llm.LLMError('still down'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), ('failed', 2, 'still down'))
+        self.assertEqual(self.status()['status'], 'failed')
+
+    def test_empty_result_reports_failed(self):
+        [job] = jobs.claim(5)
+        self.assertEqual(self.status()['status'], 'running')
+        jobs.finish_job(job, text='')
+        self.assertEqual(self.status(), {'status': 'failed', 'suggestion': None})
+
+
+class DashboardTests(FakeLLMTestCase):
+    async def test_slow_section_falls_back_alone(self):
+        await Mood.objects.acreate(user=self.user, mood_type='sad', note='rain')
+
+        async def slow_playlist(mood_type, note):
+            await asyncio.sleep(5)
+
+        budgets = {'wisdom': 5, 'challenges': 5, 'playlist': 0.05}
+        with self.settings(LLM_LATENCY_BUDGETS=budgets), \
+                mock.patch('myapp.generation.aplaylist_description', slow_playlist), \
+                mock.patch('myapp.llm.fallback') as fallback:
+            response = await self.async_client.get('/dashboard/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['playlist_description'], PLAYLIST_MOOD_DESCRIPTIONS['sad'])
+        self.assertNotEqual(response.context['daily_wisdom'], DEFAULT_WISDOM)
+        fallback.assert_called_once_with('playlist')
+
+    async def test_no_moods_records_no_challenges_fallback(self):
+        with mock.patch('myapp.llm.fallback') as fallback:
+            response = await self.async_client.get('/dashboard/')
+
+        self.assertEqual(response.context['challenges'], FALLBACK_CHALLENGES)
+        self.assertNotIn(mock.call('challenges'), fallback.call_args_list)
+
+
+class DailyWisdomCommandTests(FakeLLMTestCase):
+    def test_second_run_on_the_same_day_generates_nothing(self):
+        Mood.objects.create(user=self.user, mood_type='happy', note='sunny')
+
+        with mock.patch('myapp.llm.generate', return_value='Enjoy it.') as generate:
+            call_command('generate_daily_wisdom', stdout=StringIO())
+            llm_cache.get_cache().clear()
+            call_command('generate_daily_wisdom', stdout=StringIO())
+
+        self.assertEqual(generate.call_count, 1)
+        wisdom = DailyWisdom.objects.get()
+        self.assertEqual((wisdom.user, wisdom.mood_type, wisdom.text), (self.user, 'happy', 'Enjoy it.'))
+
+
+ANALYSIS = """Mood Overview:
+A calm month.
+Patterns Observed:
+- Better on weekends
+- Tired on Mondays
+Emotional Insight:
+Rest helps.
+Gentle Suggestions:
+- Sleep earlier
+"""
+
+
+class MonthlyAnalysisParserTests(SimpleTestCase):
+    def test_chunks_split_mid_line(self):
+        parser = MonthlyAnalysisParser()
+        events = []
+        for i in range(0, len(ANALYSIS), 7):
+            events += parser.feed(ANALYSIS[i:i + 7])
+        events += parser.close()
+        self.assertEqual(events, [
+            ('overview', 'A calm month.'),
+            ('patterns', 'Better on weekends'),
+            ('patterns', 'Tired on Mondays'),
+            ('insight', 'Rest helps.'),
+            ('suggestions', 'Sleep earlier'),
+        ])
+
+    def test_whole_text_matches_streamed(self):
+        sections = parse_monthly_analysis(ANALYSIS.rstrip("\n"))
+        self.assertEqual(sections['patterns'], ['Better on weekends', 'Tired on Mondays'])
+        self.assertEqual(sections['suggestions'], ['Sleep earlier'])
+        self.assertEqual(sections['overview'].strip(), 'A calm month.')
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+        notes = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return 'shared'
+
+        def caller():
+            note = {}
+            joined.set(note)
+            results.append(flight.do('key', work))
+            notes.append(note)
+
+        threads = [threading.Thread(target=caller) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        # Wait until every follower has joined the leader's call
+        while flight.stats()['coalesced'] < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['shared'] * 4)
+        self.assertEqual(sum(1 for note in notes if note.get('coalesced')), 3)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_followers_get_the_leaders_exception(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def work():
+            started.set()
+            release.wait(5)
+            raise RuntimeError('boom')
+
+        def caller():
+            try:
+                flight.do('key', work)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        leader = threading.Thread(target=caller)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=caller)
+        follower.start()
+        while flight.stats()['coalesced'] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(len(errors), 2)
+
+    def test_sequential_calls_run_again(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+
+    def test_async_leader_running_do_in_a_thread_is_counted_once_per_layer(self):
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            return 'shared'
+
+        async def main():
+            # The same shape as LLMGateway.agenerate
+            def call():
+                return flight.ado('key', lambda: asyncio.to_thread(flight.do, 'key', work))
+            return await asyncio.gather(call(), call(), call())
+
+        self.assertEqual(asyncio.run(main()), ['shared'] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats(), {
+            'calls': 1, 'coalesced': 0, 'in_flight': 0,
+            'async_calls': 1, 'async_coalesced': 2, 'async_in_flight': 0,
+        })
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+
+    def trip(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def test_opens_after_threshold_and_refuses(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()['rejected'], 1)
+
+    def test_single_probe_after_reset_timeout(self):
+        self.trip()
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        self.clock.now = 30
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.opened_at, 30)
+
+    def test_late_success_does_not_close_an_open_circuit(self):
+        self.trip()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_skipped_probe_can_be_retried(self):
+        self.trip()
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_skipped()
+        self.assertTrue(self.breaker.allow())
+
+
+BUNDLE = """{
+  "wisdom": "Breathe.",
+  "challenges": [
+    {"emoji": "a", "title": "One", "description": "First"},
+    {"emoji": "b", "title": "Two", "description": "Second"},
+    {"emoji": "c", "title": "Three", "description": "Third"},
+    {"emoji": "d", "title": "Four", "description": "Fourth"}
+  ],
+  "playlist_description": "Soft songs."
+}"""
+
+
+class ParseBundleTests(SimpleTestCase):
+    def test_valid_bundle(self):
+        bundle = parse_bundle(BUNDLE)
+        self.assertEqual(bundle['wisdom'], 'Breathe.')
+        self.assertEqual([c['title'] for c in bundle['challenges']], ['One', 'Two', 'Three'])
+
+    def test_code_fence_is_tolerated(self):
+        self.assertEqual(parse_bundle(f"```json\n{BUNDLE}\n```")['playlist_description'], 'Soft songs.')
+
+    def test_incomplete_bundle(self):
+        with self.assertRaises(ValueError):
+            parse_bundle('{"wisdom": "Breathe.", "challenges": [], "playlist_description": "x"}')
+
+    def test_not_json(self):
+        with self.assertRaises(ValueError):
+            parse_bundle("Sorry, I can't help with that.")
+
+
+class DailyBundleTests(FakeLLMTestCase):
+    def test_bundle_is_cached_for_the_day(self):
+        Mood.objects.create(user=self.user, mood_type='calm', note='tea')
+        with mock.patch('myapp.llm.generate', return_value=BUNDLE) as generate:
+            first = generation.daily_bundle(self.user)
+            self.assertEqual(generation.daily_bundle(self.user), first)
+        self.assertEqual(first['wisdom'], 'Breathe.')
+        self.assertEqual(generate.call_count, 1)
+
+    def test_malformed_bundle_is_not_asked_for_again(self):
+        Mood.objects.create(user=self.user, mood_type='calm', note='tea')
+        with mock.patch('myapp.llm.generate', return_value="Sorry, I can't help with that.") as generate:
+            self.assertIsNone(generation.daily_bundle(self.user))
+            self.assertIsNone(generation.daily_bundle(self.user))
+        self.assertEqual(generate.call_count, 1)
+
+
+class MoodSignalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('signals')
+
+    def rollup(self, day=None):
+        return MoodDailyRollup.objects.get(user=self.user, date=day or timezone.localdate())
+
+    def counter(self, mood_type):
+        return MoodTypeCounter.objects.filter(mood_type=mood_type).values_list('count', flat=True).first() or 0
+
+    def test_save_counts_the_entry(self):
+        Mood.objects.create(user=self.user, mood_type='happy', note='a')
+        Mood.objects.create(user=self.user, mood_type='sad', note='b')
+        rollup = self.rollup()
+        self.assertEqual((rollup.total, rollup.happy, rollup.sad), (2, 1, 1))
+        self.assertEqual((self.counter('happy'), self.counter('sad')), (1, 1))
+
+    def test_edit_moves_the_entry_to_its_new_type(self):
+        mood = Mood.objects.create(user=self.user, mood_type='happy', note='a')
+        mood.mood_type = 'tired'
+        mood.save()
+        rollup = self.rollup()
+        self.assertEqual((rollup.total, rollup.happy, rollup.tired), (1, 0, 1))
+        self.assertEqual((self.counter('happy'), self.counter('tired')), (0, 1))
+
+    def test_edit_without_type_change_keeps_counts(self):
+        mood = Mood.objects.create(user=self.user, mood_type='calm', note='a')
+        mood.note = 'b'
+        mood.save()
+        self.assertEqual(self.rollup().total, 1)
+        self.assertEqual(self.counter('calm'), 1)
+
+    def test_delete_removes_the_entry_and_empty_day(self):
+        keep = Mood.objects.create(user=self.user, mood_type='calm', note='a')
+        Mood.objects.create(user=self.user, mood_type='angry', note='b').delete()
+        rollup = self.rollup()
+        self.assertEqual((rollup.total, rollup.angry, rollup.calm), (1, 0, 1))
+        self.assertEqual(self.counter('angry'), 0)
+
+        keep.delete()
+        self.assertFalse(MoodDailyRollup.objects.filter(user=self.user).exists())
+        self.assertEqual(self.counter('calm'), 0)
+
+    def test_entries_land_on_their_own_day(self):
+        mood = Mood.objects.create(user=self.user, mood_type='happy', note='a')
+        yesterday = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=1), time(12)))
+        Mood.objects.filter(pk=mood.pk).update(created_at=yesterday)
+        rollups.rebuild_day(self.user.pk, timezone.localdate())
+        rollups.rebuild_day(self.user.pk, timezone.localdate(yesterday))
+        self.assertEqual(self.rollup(timezone.localdate(yesterday)).happy, 1)
+        self.assertFalse(MoodDailyRollup.objects.filter(user=self.user, date=timezone.localdate()).exists())
+
+
+class StreakTests(SimpleTestCase):
+    today = date(2026, 3, 10)
+
+    def days(self, *offsets):
+        return [self.today - timedelta(days=offset) for offset in offsets]
+
+    def test_no_entries(self):
+        self.assertEqual(streaks.compute([], self.today), (0, 0))
+
+    def test_run_ending_today(self):
+        self.assertEqual(streaks.compute(self.days(0, 1, 2), self.today), (3, 3))
+
+    def test_run_ending_yesterday_is_still_current(self):
+        self.assertEqual(streaks.compute(self.days(1, 2), self.today), (2, 2))
+
+    def test_broken_run(self):
+        self.assertEqual(streaks.compute(self.days(2, 3), self.today), (0, 2))
+
+    def test_longest_is_an_older_run(self):
+        self.assertEqual(streaks.compute(self.days(0, 3, 4, 5, 6), self.today), (1, 4))
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('paging')
+        moods = [Mood.objects.create(user=self.user, mood_type='calm', note=str(i)) for i in range(7)]
+        # Several entries share a timestamp, so only the id tells them apart
+        base = timezone.now().replace(microsecond=0)
+        for i, mood in enumerate(moods):
+            Mood.objects.filter(pk=mood.pk).update(created_at=base + timedelta(seconds=i // 3))
+        self.ordered = list(Mood.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def pks(self, page):
+        return [mood.pk for mood in page.object_list]
+
+    def test_walks_forwards_across_ties(self):
+        seen = []
+        page = pagination.paginate(Mood.objects.all(), 3)
+        self.assertFalse(page.has_previous)
+        seen += self.pks(page)
+        while page.has_next:
+            page = pagination.paginate(Mood.objects.all(), 3, after=page.next_cursor)
+            seen += self.pks(page)
+        self.assertEqual(seen, self.ordered)
+
+    def test_before_cursor_returns_the_previous_page(self):
+        first = pagination.paginate(Mood.objects.all(), 3)
+        second = pagination.paginate(Mood.objects.all(), 3, after=first.next_cursor)
+        back = pagination.paginate(Mood.objects.all(), 3, before=second.previous_cursor)
+        self.assertEqual(self.pks(back), self.pks(first))
+        self.assertFalse(back.has_previous)
+        self.assertEqual(back.next_cursor, first.next_cursor)
+
+    def test_malformed_cursor_gives_the_first_page(self):
+        page = pagination.paginate(Mood.objects.all(), 3, after='not-a-cursor')
+        self.assertEqual(self.pks(page), self.ordered[:3])
+
+    @override_settings(MOOD_ENTRY_PAGE_SIZE=3)
+    def test_load_more_fragment_follows_the_cursor(self):
+        Mood.objects.create(user=User.objects.create_user('other'), mood_type='sad', note='not mine')
+        self.client.force_login(self.user)
+        seen = []
+        url = '/entry/more/'
+        while url:
+            response = self.client.get(url)
+            self.assertTemplateUsed(response, 'mood_entries_fragment.html')
+            self.assertNotContains(response, 'not mine')
+            seen += [mood.pk for mood in response.context['moods']]
+            url = response.context['next_url']
+        self.assertEqual(seen, self.ordered)
+        self.assertNotContains(response, 'data-next-url')
+
+
+class LttbTests(SimpleTestCase):
+    def test_short_series_is_kept_whole(self):
+        self.assertEqual(lttb([(0, 1), (1, 2)], 5), [0, 1])
+
+    def test_keeps_ends_and_the_spike(self):
+        points = [(x, 0) for x in range(100)]
+        points[37] = (37, 50)
+        kept = lttb(points, 10)
+        self.assertEqual(len(kept), 10)
+        self.assertEqual((kept[0], kept[-1]), (0, 99))
+        self.assertIn(37, kept)
+        self.assertEqual(kept, sorted(kept))
+
+    def test_threshold_too_small(self):
+        with self.assertRaises(ValueError):
+            lttb([(x, x) for x in range(10)], 2)
+
+
+@override_settings(STATS_MAX_DAYS=1000)
+class MoodStatsApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('stats', password='pw')
+        self.client.force_login(self.user)
+
+    def get(self, **params):
+        return self.client.get('/api/mood-stats/', params)
+
+    def test_counts_per_day(self):
+        Mood.objects.create(user=self.user, mood_type='happy', note='a')
+        today = timezone.localdate()
+        data = self.get(start=(today - timedelta(days=6)).isoformat(), end=today.isoformat()).json()
+        self.assertEqual([(p['period'], p['total'], p['happy']) for p in data['points']], [(today.isoformat(), 1, 1)])
+
+    def test_ranges_that_cannot_be_served(self):
+        for params in [
+            {'start': '2024-02-01', 'end': '2024-01-01'},
+            {'start': '9999-12-01', 'end': '9999-12-31'},
+            {'end': '0001-01-05'},
+            {'start': '2000-01-01', 'end': '2024-01-01'},
+            {'start': '2024-13-01'},
+        ]:
+            with self.subTest(**params):
+                self.assertEqual(self.get(**params).status_code, 400)
+
+    def test_longest_allowed_range(self):
+        self.assertEqual(self.get(start='2024-01-01', end='2026-09-26').status_code, 200)
+        self.assertEqual(self.get(start='2024-01-01', end='2026-09-27').status_code, 400)
+
+
+@override_settings(LLM_PROMPT_TOKEN_BUDGET=300, LLM_LEDGER_PATH='')
+class DigestTests(SimpleTestCase):
+    def setUp(self):
+        llm_cache.get_cache().clear()
+        self.addCleanup(llm_cache.get_cache().clear)
+        monday = timezone.make_aware(datetime(2026, 3, 2, 12))
+        # Three weeks, five long entries each
+        self.moods = [
+            Mood(pk=week * 10 + day, mood_type='calm', note=f"day {day} " + "x" * 100,
+                 created_at=monday + timedelta(weeks=week, days=day))
+            for week in range(3) for day in range(5)
+        ]
+        self.prompts = []
+        patcher = mock.patch('myapp.llm.generate', side_effect=self.generate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def generate(self, feature, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return "A steady, calm week."
+
+    def test_short_month_goes_in_raw(self):
+        text = summarize.digest(self.moods[:2], 'viewer')
+        self.assertEqual(text.splitlines(), [summarize.entry_line(m) for m in self.moods[:2]])
+        self.assertEqual(self.prompts, [])
+
+    def test_long_month_is_one_summary_per_week_within_the_budget(self):
+        text = summarize.digest(self.moods, 'viewer')
+        self.assertEqual(len(self.prompts), 3)
+        self.assertEqual(len(text.splitlines()), 3)
+        self.assertTrue(text.startswith("Week of March 02: A steady, calm week."))
+        self.assertLessEqual(summarize.estimate_tokens(text), 300)
+
+    def test_only_a_changed_week_is_summarized_again(self):
+        summarize.digest(self.moods, 'viewer')
+        self.moods[-1].note = 'something new'
+        summarize.digest(self.moods, 'viewer')
+        self.assertEqual(len(self.prompts), 4)
+        self.assertIn('something new', self.prompts[-1])
+
+
+class MonthlyReportTests(FakeLLMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mood = Mood.objects.create(user=self.user, mood_type='calm', note='quiet')
+        patcher = mock.patch('myapp.llm.generate', return_value=ANALYSIS)
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def visit(self):
+        response = self.client.get('/monthly-analysis/')
+        self.assertEqual(response.context['analysis']['overview'].strip(), 'A calm month.')
+
+    def test_saved_report_is_served_while_the_entries_match(self):
+        self.visit()
+        self.visit()
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(MonthlyReport.objects.filter(user=self.user, kind='monthly_analysis').count(), 1)
+
+    def test_new_entry_changes_the_hash(self):
+        self.visit()
+        Mood.objects.create(user=self.user, mood_type='happy', note='sun')
+        self.visit()
+        self.assertEqual(self.generate.call_count, 2)
+
+    def test_editing_an_entry_drops_the_report(self):
+        self.visit()
+        self.mood.note = 'not so quiet'
+        self.mood.save()
+        self.assertFalse(MonthlyReport.objects.filter(user=self.user).exists())
+        self.visit()
+        self.assertEqual(self.generate.call_count, 2)
+
+
+class FakeProviderTests(SimpleTestCase):
+    LATENCY = {'default': {'distribution': 'uniform', 'low': 0.1, 'high': 2.0}}
+
+    def make(self, seed=0, error_rate=0.3):
+        slept = []
+        provider = FakeProvider(latency=self.LATENCY, error_rate=error_rate, seed=seed, sleep=slept.append)
+        return provider, slept
+
+    def run_calls(self, provider):
+        outcomes = []
+        for i in range(20):
+            try:
+                outcomes.append(provider.generate('wisdom', f"prompt {i}", timeout=1.5))
+            except (FakeProviderError, TimeoutError) as exc:
+                outcomes.append(type(exc).__name__)
+        return outcomes
+
+    def test_same_seed_same_answers_delays_and_failures(self):
+        first, first_slept = self.make()
+        second, second_slept = self.make()
+        self.assertEqual(self.run_calls(first), self.run_calls(second))
+        self.assertEqual(first_slept, second_slept)
+        self.assertTrue(all(0 <= seconds <= 1.5 for seconds in first_slept))
+
+    def test_answer_depends_on_seed_feature_and_prompt(self):
+        provider, _ = self.make(error_rate=0)
+        self.assertEqual(provider.respond('wisdom', 'a'), self.make(error_rate=0)[0].respond('wisdom', 'a'))
+        self.assertNotEqual(provider.respond('wisdom', 'a'), self.make(seed=1)[0].respond('wisdom', 'a'))
+        self.assertEqual(len(parse_bundle(provider.respond('daily_bundle', 'a'))['challenges']), 3)
+        self.assertTrue(any(parse_monthly_analysis(provider.respond('monthly_analysis', 'a')).values()))
+
+    def test_stream_adds_up_to_the_answer(self):
+        provider, _ = self.make(error_rate=0)
+        chunks = list(provider.stream('suggestion', 'p', timeout=10))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), provider.respond('suggestion', 'p'))
+
+    def test_provider_without_generate_cannot_be_built(self):
+        class Incomplete(Provider):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete.from_settings()
+
+
+class SeedMoodsTests(TestCase):
+    def seed(self, *args):
+        call_command('seed_moods', '--users=3', '--moods=60', '--days=30', '--until=2026-01-01', *args,
+                     stdout=StringIO())
+        return list(Mood.objects.order_by('user__username', 'created_at').values_list(
+            'user__username', 'created_at', 'mood_type', 'note'))
+
+    def test_entries_keep_their_generated_times(self):
+        rows = self.seed()
+        self.assertTrue(rows)
+        until = timezone.make_aware(datetime(2026, 1, 1))
+        self.assertTrue(all(until - timedelta(days=31) < created_at < until for _, created_at, _, _ in rows))
+        self.assertTrue(Mood._meta.get_field('created_at').auto_now_add)
+
+    def test_clear_and_raw_insert_write_the_same_rows(self):
+        rows = self.seed()
+        self.assertEqual(self.seed('--clear', '--raw'), rows)
+        self.assertEqual(MoodTypeCounter.objects.aggregate(total=Sum('count'))['total'], len(rows))
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_SAMPLE_RATE=1.0, LLM_DAILY_BUNDLE_ENABLED=False)
+class RequestTimingTests(FakeLLMTestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.install()
+        Mood.objects.create(user=self.user, mood_type='calm', note='tea')
+
+    def timing(self, response):
+        parts = response.headers['Server-Timing'].split(',')
+        return {part.split(';')[0].strip(): part for part in parts}
+
+    def test_server_timing_header(self):
+        with self.assertLogs('myapp.timing', 'INFO') as logs:
+            response = self.client.get('/wisdom/')
+        timing = self.timing(response)
+        self.assertEqual(set(timing), {'db', 'llm', 'tpl', 'total'})
+        self.assertIn('desc="1 calls"', timing['llm'])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['route'], record['llm_calls']), ('wisdom', 1))
+        self.assertGreater(record['db_queries'], 0)
+        self.assertIn(f'desc="{record["db_queries"]} queries"', timing['db'])
+        self.assertFalse(record['over_query_budget'])
+
+    @override_settings(REQUEST_QUERY_BUDGETS={'wisdom': 1})
+    def test_over_budget_request_is_a_warning(self):
+        with self.assertLogs('myapp.timing', 'WARNING') as logs:
+            self.client.get('/wisdom/')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['query_budget'], record['over_query_budget']), (1, True))
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_left_alone(self):
+        self.assertNotIn('Server-Timing', self.client.get('/wisdom/').headers)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+
+    def write_other(self, pid, values):
+        other = metrics.snapshot()
+        for data in other.values():
+            data['values'] = []
+        for name, value in values.items():
+            other[name]['values'] = [value]
+        with open(os.path.join(self.dir, f"{pid}.json"), 'w') as f:
+            json.dump(other, f)
+
+    def test_other_processes_snapshots_are_added_up(self):
+        metrics.LLM_CALLS.inc('metrics_test', amount=2)
+        metrics.REQUEST_DURATION.observe(0.3, 'metrics_test')
+        one_fast_request = [1] + [0] * len(metrics.LATENCY_BUCKETS) + [0.003, 1]
+        self.write_other(os.getppid(), {
+            'moodmirror_llm_calls_total': [['metrics_test'], 3],
+            'moodmirror_request_duration_seconds': [['metrics_test'], one_fast_request],
+            'moodmirror_llm_calls_in_flight': [['metrics_test'], 1],
+        })
+        # A process that has exited: its counters still count, its gauges don't
+        self.write_other(2 ** 22 + 1, {
+            'moodmirror_llm_calls_total': [['metrics_test'], 4],
+            'moodmirror_llm_calls_in_flight': [['metrics_test'], 5],
+        })
+
+        with self.settings(METRICS_DIR=self.dir):
+            lines = metrics.render(metrics.gather()).splitlines()
+
+        self.assertIn('moodmirror_llm_calls_total{feature="metrics_test"} 9', lines)
+        self.assertIn('moodmirror_llm_calls_in_flight{feature="metrics_test"} 1', lines)
+        self.assertIn('moodmirror_request_duration_seconds_bucket{view="metrics_test",le="0.005"} 1', lines)
+        self.assertIn('moodmirror_request_duration_seconds_bucket{view="metrics_test",le="0.5"} 2', lines)
+        self.assertIn('moodmirror_request_duration_seconds_bucket{view="metrics_test",le="+Inf"} 2', lines)
+        self.assertIn('moodmirror_request_duration_seconds_count{view="metrics_test"} 2', lines)
+
+    def test_endpoint_is_hidden_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '# TYPE moodmirror_llm_calls_total counter')
+
+    @override_settings(METRICS_BEARER_TOKEN='s3cret')
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer nope'}).status_code, 401)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code, 200)
+
+
+class LedgerTests(FakeLLMTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'ledger.jsonl')
+        override = self.settings(LLM_LEDGER_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Don't leave this test's records buffered for the next one
+        self.addCleanup(ledger.flush)
+
+        generation.generate_wisdom('viewer', 'calm')
+        generation.generate_wisdom('viewer', 'calm')
+        with mock.patch.object(llm.get_gateway().provider, 'generate', side_effect=RuntimeError('down')):
+            with self.assertRaises(llm.LLMError):
+                llm.generate('suggestion', 'help me')
+        llm.fallback('suggestion')
+
+    def test_calls_hits_errors_and_fallbacks_are_written(self):
+        ledger.flush()
+        entries = list(ledger.read(self.path))
+        self.assertEqual([(e['feature'], e['outcome'], e['cache']) for e in entries], [
+            ('wisdom', 'ok', 'miss'),
+            ('wisdom', 'ok', 'hit'),
+            ('suggestion', 'error', None),
+            ('suggestion', 'fallback', None),
+        ])
+        self.assertEqual(entries[2]['prompt_chars'], len('help me'))
+
+    def test_report_aggregates_per_feature(self):
+        out = StringIO()
+        call_command('llm_ledger_report', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(
+            {key: report['wisdom'][key] for key in ('calls', 'errors', 'fallbacks', 'cache_hits', 'cache_hit_rate')},
+            {'calls': 1, 'errors': 0, 'fallbacks': 0, 'cache_hits': 1, 'cache_hit_rate': 0.5},
+        )
+        self.assertEqual(
+            {key: report['suggestion'][key] for key in ('calls', 'errors', 'fallbacks', 'cache_hits')},
+            {'calls': 1, 'errors': 1, 'fallbacks': 1, 'cache_hits': 0},
+        )
+        self.assertEqual(sum(report['wisdom']['daily'].values()), 1)
+
+        out = StringIO()
+        call_command('llm_ledger_report', stdout=out)
+        self.assertRegex(out.getvalue(), r"suggestion +1 +1 +1 ")
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, p) for p in (1, 50, 95, 100)], [1, 50, 95, 100])
+        self.assertEqual(percentile([7], 99), 7)
 
-# Create your tests here.
@@ -5,6 +5,7 @@ from .views import login_view, logout_view, wisdom_view, wellness_analytics, min
 urlpatterns = [
     path('', views.landing, name='landing'),
     path('home/', views.home, name='home'),
+    path('dashboard/', views.dashboard, name='dashboard'),
     path("login/", login_view, name='login'),
     path("logout/", logout_view, name='logout'),
     path('wisdom/', wisdom_view, name='wisdom'),
@@ -12,10 +13,14 @@ urlpatterns = [
     path('signup/', views.signup, name='signup'),
     path('signup-success/', views.signup_success,name='signup_success'),
     path('monthly-analysis/', views.monthly_analysis,name='monthly_analysis'),
+    path('monthly-analysis/stream/', views.monthly_analysis_stream, name='monthly_analysis_stream'),
     path('entry/', views.mood_entry, name='mood_entry'),
+    path('entry/more/', views.mood_entry_more, name='mood_entry_more'),
     path('history/', mood_history, name='mood_history'),
     path('reflection/', views.mood_entry,name='reflection'),
     path('suggestion/', views.suggestion,name='suggestion'),
+    path('suggestion/status/<int:mood_id>/', views.suggestion_status, name='suggestion_status'),
+    path('suggestion/stream/', views.suggestion_stream, name='suggestion_stream'),
     path('analytics/', views.analytics, name='analytics'),
     path('wellness-analytics/', wellness_analytics, name='wellness_analytics'),
     path('wellness-insights/', wellness_insights, name='wellness_insights'),
@@ -23,4 +28,7 @@ urlpatterns = [
     path('personalized-playlist/', personalized_playlist, name='personalized_playlist'),
     path('mood-playlists/', mood_playlists, name='mood_playlists'),
     path('thankyou/', views.thank_you, name='thank_you'),
+    path('api/mood-stats/', views.mood_stats_api, name='mood_stats_api'),
+    path('llm-status/', views.llm_status, name='llm_status'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
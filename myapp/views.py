@@ -1,16 +1,56 @@
-from django.shortcuts import render, redirect
-import google.generativeai as genai
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.conf import settings
+from . import distribution, generation, jobs, llm, llm_cache, metrics, reports, rollups, streaks, summarize
+from .downsample import lttb
+from .dates import month_bounds
+from .pagination import paginate
 from .forms import MoodForm
-from datetime import timedelta, datetime
+from datetime import date, timedelta, datetime
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 import json
-from django.db.models import Count
-from .models import Mood
-from django.core.paginator import Paginator
+from .models import DailyWisdom, Mood, Suggestion
 from django.db.models import Q
+import asyncio
+import hashlib
+import hmac
+
+# 🌸 Fallback content - shown whenever the AI can't answer in time
+DEFAULT_WISDOM = "Slow down. You are allowed to heal at your own pace."
+
+FALLBACK_CHALLENGES = [
+    {
+        "emoji": "🧘",
+        "title": "5-Minute Meditation",
+        "description": "Start your day with a brief meditation to calm your mind"
+    },
+    {
+        "emoji": "🚶",
+        "title": "Mindful Walk",
+        "description": "Take a slow walk and notice the world around you"
+    },
+    {
+        "emoji": "📓",
+        "title": "Gratitude Journal",
+        "description": "Write three things you're grateful for today"
+    }
+]
+
+PLAYLIST_MOOD_DESCRIPTIONS = {
+    'happy': 'Keep the good vibes flowing with uplifting tracks that celebrate joy and positivity.',
+    'calm': 'Soothe your mind with gentle, peaceful music that helps you relax and find inner peace.',
+    'sad': 'Allow yourself to feel and process your emotions with meaningful, reflective songs.',
+    'anxious': 'Find comfort and grounding with music that eases tension and brings stability.',
+    'energetic': 'Amplify your energy with dynamic, uplifting tracks that keep you moving forward.',
+}
+DEFAULT_PLAYLIST_DESCRIPTION = 'Enjoy music tailored to your emotional needs right now.'
 
 def landing(request):
     return render(request, 'landing.html')
@@ -20,6 +60,74 @@ def home(request):
     """Dashboard/home page shown after login"""
     return render(request, 'home.html')
 
+@login_required(login_url='/login/')
+async def dashboard(request):
+    """AI dashboard - wisdom, challenges and playlist generated concurrently on one page"""
+    user = await request.auser()
+
+    recent_moods = [
+        m async for m in Mood.objects.filter(user=user).order_by('-created_at').values('mood_type', 'note')[:7]
+    ]
+    recent_mood = recent_moods[0]['mood_type'] if recent_moods else 'calm'
+    recent_note = recent_moods[0]['note'] if recent_moods else ''
+    mood_text = ", ".join(m['mood_type'] for m in recent_moods)
+
+    # A quote already written by the nightly run needs no AI call at all
+    saved_quote = await DailyWisdom.objects.filter(
+        user=user, date=timezone.localdate(), mood_type=recent_mood
+    ).values_list('text', flat=True).afirst()
+
+    async def wisdom():
+        return saved_quote or await generation.agenerate_wisdom(user.username, recent_mood)
+
+    # All three sections run at once, each bounded by its own latency budget,
+    # so the page takes as long as the slowest section rather than the sum
+    daily_wisdom, personalized_challenges, playlist_description = await asyncio.gather(
+        _section('wisdom', wisdom(), DEFAULT_WISDOM),
+        # Without moods there is nothing to personalize: no call, so no fallback to record either
+        _section(
+            'challenges',
+            generation.agenerate_challenges(mood_text) if mood_text else None,
+            FALLBACK_CHALLENGES,
+        ),
+        _section(
+            'playlist',
+            generation.aplaylist_description(recent_mood, recent_note),
+            PLAYLIST_MOOD_DESCRIPTIONS.get(recent_mood.lower(), DEFAULT_PLAYLIST_DESCRIPTION),
+        ),
+    )
+
+    # Keep the quote for the rest of the day, as wisdom_view does
+    if not saved_quote and daily_wisdom != DEFAULT_WISDOM:
+        await DailyWisdom.objects.aget_or_create(
+            user=user, date=timezone.localdate(), mood_type=recent_mood,
+            defaults={'text': daily_wisdom},
+        )
+
+    context = {
+        'username': user.username,
+        'recent_mood': recent_mood,
+        'daily_wisdom': daily_wisdom,
+        'challenges': personalized_challenges,
+        'playlist_description': playlist_description,
+    }
+
+    return render(request, 'dashboard.html', context)
+
+async def _section(feature, coro, fallback):
+    """Await one dashboard section, giving up after the feature's latency budget; coro None skips it"""
+    if coro is None:
+        return fallback
+    try:
+        result = await asyncio.wait_for(coro, llm.get_gateway().timeout_for(feature))
+    except Exception:
+        # Slow or failed sections degrade on their own; the others still render
+        result = None
+    if not result:
+        llm.fallback(feature)
+        return fallback
+    return result
+
 @login_required(login_url='/login/')
 def logout_view(request):
     """Logout the user and redirect to landing page"""
@@ -28,7 +136,7 @@ def logout_view(request):
 
 @login_required(login_url='/login/')
 def wisdom_view(request):
-    """Daily Wisdom page - Generates personalized wisdom based on user's mood"""
+    """Daily Wisdom page - Shows the quote pre-generated for today's mood, generating it live only as a fallback"""
     username = request.user.username
     
     # Get the most recent mood from database
@@ -37,39 +145,40 @@ def wisdom_view(request):
     recent_mood = recent_mood_obj.mood_type if recent_mood_obj else 'calm'
     
     # Default fallback quote - ensures page is NEVER empty
-    daily_wisdom = "Slow down. You are allowed to heal at your own pace."
+    daily_wisdom = DEFAULT_WISDOM
     
-    try:
-        genai.configure(api_key="")
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        prompt = f"""
-You are a compassionate wellness guide. Generate a short, calming, and encouraging quote for {username} who is feeling {recent_mood} today.
-
-Requirements:
-- 1–2 lines only
-- Calm and soothing tone
-- Encouraging and uplifting
-- Mental-health friendly
-- Do NOT include any explanations or extra text, just the quote itself
-
-Example tone: "Even on quiet days, your strength is growing."
-
-Generate only the quote:
-"""
-        
-        response = model.generate_content(prompt)
-        generated_quote = response.text.strip()
-        
-        # Ensure response is not empty. If empty, use default fallback
-        if generated_quote:
-            daily_wisdom = generated_quote
-        
-    except Exception as e:
-        # If AI API call fails (network error, rate limit, invalid key, etc.),
-        # use the default fallback wisdom to prevent page breakage
-        # Page will always render with daily_wisdom set
-        pass
+    # Written by the nightly `generate_daily_wisdom` run (or an earlier visit today)
+    today = timezone.localdate()
+    saved_quote = DailyWisdom.objects.filter(
+        user=request.user, date=today, mood_type=recent_mood
+    ).values_list('text', flat=True).first()
+    
+    if saved_quote:
+        daily_wisdom = saved_quote
+    else:
+        try:
+            # One combined "daily bundle" call also covers the challenges and playlist pages
+            bundle = generation.daily_bundle(request.user) if settings.LLM_DAILY_BUNDLE_ENABLED else None
+            if bundle:
+                generated_quote = bundle['wisdom']
+            else:
+                generated_quote = generation.generate_wisdom(username, recent_mood)
+            
+            # Ensure response is not empty. If empty, use default fallback
+            if generated_quote:
+                daily_wisdom = generated_quote
+                DailyWisdom.objects.get_or_create(
+                    user=request.user, date=today, mood_type=recent_mood,
+                    defaults={'text': generated_quote},
+                )
+            else:
+                llm.fallback('wisdom')
+            
+        except Exception as e:
+            # If AI API call fails (network error, rate limit, invalid key, etc.),
+            # use the default fallback wisdom to prevent page breakage
+            # Page will always render with daily_wisdom set
+            llm.fallback('wisdom')
     
     context = {
         'username': username,
@@ -87,54 +196,60 @@ def mood_entry(request):
             mood = form.save(commit=False)
             mood.user = request.user
             mood.save()
+            if settings.GENERATION_QUEUE_ENABLED:
+                jobs.enqueue_for_mood(mood)
             return redirect('suggestion')
     else:
         form = MoodForm()
 
-    moods = Mood.objects.filter(user=request.user).order_by('-created_at')
-
-    # 🌸 Calculate streak
-    streak = 0
-    today = timezone.now().date()
-    last_date = None
-
-    for mood in moods:
-        mood_date = mood.created_at.date()
-        if last_date is None:
-            if mood_date == today:
-                streak += 1
-                last_date = today
-            elif mood_date == today - timedelta(days=1):
-                streak += 1
-                last_date = mood_date
-            else:
-                break
-        else:
-            if mood_date == last_date - timedelta(days=1):
-                streak += 1
-                last_date = mood_date
-            else:
-                break
+    # Only the latest few entries; older ones load on scroll from mood_entry_more
+    page = paginate(Mood.objects.filter(user=request.user), settings.MOOD_ENTRY_PAGE_SIZE)
+
+    # 🌸 Current streak (consecutive days journaled)
+    streak = streaks.for_user(request.user)
 
     return render(request, 'mood_entry.html', {
         'form': form,
-        'moods': moods,
-        'streak': streak
+        'moods': page.object_list,
+        'next_url': _more_entries_url(page),
+        'streak': streak.current,
+        'longest_streak': streak.longest,
     })
+
+@login_required(login_url='/login/')
+def mood_entry_more(request):
+    """Recent entries fragment - the next page of entries for mood_entry's scroll loading"""
+    page = paginate(
+        Mood.objects.filter(user=request.user),
+        settings.MOOD_ENTRY_PAGE_SIZE,
+        after=request.GET.get('after'),
+    )
+    return render(request, 'mood_entries_fragment.html', {
+        'moods': page.object_list,
+        'next_url': _more_entries_url(page),
+    })
+
+def _more_entries_url(page):
+    if not page.has_next:
+        return None
+    return f"{reverse('mood_entry_more')}?after={page.next_cursor}"
 def mood_history(request):
     moods = Mood.objects.filter(user=request.user).order_by('-date')
     return render(request, 'mood_history.html', {'moods': moods})
 
 
+@login_required(login_url='/login/')
 def analytics(request):
-    mood_data = (
-        Mood.objects
-        .values('mood')
-        .annotate(count=Count('mood'))
-    )
+    """Analytics page - the user's mood breakdown next to everyone's"""
+    # Yours: summed from your daily rollups. Everyone's: maintained counters, no scan of Mood
+    mood_data, total_entries = distribution.for_user(request.user)
+    global_mood_data, global_total = distribution.site_wide()
 
     return render(request, 'analytics.html', {
-        'mood_data': mood_data
+        'mood_data': mood_data,
+        'total_entries': total_entries,
+        'global_mood_data': global_mood_data,
+        'global_total': global_total,
     })
 def thank_you(request):
     return render(request, 'thank_you.html')
@@ -175,6 +290,8 @@ def reflection(request):
             mood_entry = form.save(commit=False)
             mood_entry.user = request.user
             mood_entry.save()
+            if settings.GENERATION_QUEUE_ENABLED:
+                jobs.enqueue_for_mood(mood_entry)
 
             # Store the last saved mood id in session to use in suggestion page
             request.session['last_mood_id'] = mood_entry.id
@@ -192,33 +309,142 @@ def reflection(request):
 
 @login_required(login_url="/login/")
 def suggestion(request):
-    # get the latest mood of the logged-in user
-    mood = Mood.objects.filter(user=request.user).order_by('-created_at').first()
+    """Suggestion page - Shows the saved AI suggestion for the latest mood, generating it only once"""
+    # get the latest mood of the logged-in user (with its saved suggestion, if any)
+    mood = (
+        Mood.objects.filter(user=request.user)
+        .select_related('suggestion')
+        .order_by('-created_at')
+        .first()
+    )
 
     llm_suggestion = None
+    pending = False
+    streaming = False
+
+    # Regeneration is explicit: only a POST from the "new suggestion" button.
+    # The old text stays until a new one replaces it, so a failed call loses nothing
+    if request.method == "POST" and 'regenerate' in request.POST:
+        if mood:
+            Suggestion.objects.filter(mood=mood).update(stale=True)
+            if settings.GENERATION_QUEUE_ENABLED:
+                jobs.enqueue_for_mood(mood, kinds=["suggestion"])
+        return redirect('suggestion')
+
+    saved = _saved_suggestion(mood)
+    if saved is not None and not saved.stale:
+        llm_suggestion = saved.text
+
+    if mood and llm_suggestion is None:
+        if settings.GENERATION_QUEUE_ENABLED and jobs.pending_suggestion_job(mood):
+            # The worker is on it - render a placeholder that polls suggestion_status
+            pending = True
+        elif settings.LLM_STREAMING_ENABLED:
+            # Render the shell now and let suggestion_stream fill it in
+            streaming = True
+        else:
+            try:
+                llm_suggestion = generation.generate_suggestion(mood)
+            except llm.LLMError:
+                # Nothing new is saved, so the next visit tries again; until then the old text stands
+                llm_suggestion = saved.text if saved is not None else None
+                if saved is None:
+                    llm.fallback('suggestion')
 
-    if mood:
-        # 🔑 configure Gemini API
-        genai.configure(api_key="")
+    return render(request, 'suggestion.html', {
+        'llm_suggestion': llm_suggestion,
+        'mood_type': mood.mood_type if mood else None,
+        'mood_id': mood.id if mood else None,
+        'pending': pending,
+        'streaming': streaming,
+        'poll_timeout': settings.GENERATION_JOB_STALE_SECONDS,
+    })
 
-        model = genai.GenerativeModel("gemini-2.5-flash")
 
-        prompt = f"""
-        The user is feeling {mood.mood_type}.
-        Their journal note is: "{mood.note}"
+def _saved_suggestion(mood):
+    """The mood's Suggestion row (possibly stale), or None"""
+    if mood is None:
+        return None
+    try:
+        return mood.suggestion
+    except Suggestion.DoesNotExist:
+        return None
 
-        Give a short, kind, emotionally supportive suggestion,
-        exercises both physical and mental.
-        Keep it calm, pastel, friendly, and comforting.
-        Give little medical advice. Use some emojis.
-        """
 
-        response = model.generate_content(prompt)
-        llm_suggestion = response.text
+@login_required(login_url="/login/")
+def suggestion_status(request, mood_id):
+    """Polled by the suggestion page while a queued suggestion is being generated"""
+    mood = get_object_or_404(Mood.objects.select_related('suggestion'), id=mood_id, user=request.user)
+
+    saved = _saved_suggestion(mood)
+    if saved is not None and not saved.stale:
+        return JsonResponse({'status': 'done', 'suggestion': saved.text})
+
+    job = jobs.latest_suggestion_job(mood)
+    status = job.status if job else 'none'
+    if status == 'done':
+        # The job finished with an empty reply: nothing is coming, show the fallback now
+        status = 'failed'
+    return JsonResponse({'status': status, 'suggestion': None})
+
+
+@login_required(login_url="/login/")
+async def suggestion_stream(request):
+    """Server-Sent Events feed of the latest mood's suggestion; saved once it completes"""
+    user = await request.auser()
+    mood = await (
+        Mood.objects.filter(user=user)
+        .select_related('suggestion')
+        .order_by('-created_at')
+        .afirst()
+    )
+
+    async def events():
+        if mood is None:
+            yield _sse('error', {'message': "No suggestion available right now."})
+            return
+
+        # Already generated (e.g. by the worker) - send it in one piece
+        saved = _saved_suggestion(mood)
+        if saved is not None and not saved.stale:
+            yield _sse('chunk', {'text': saved.text})
+            yield _sse('done', {})
+            return
+
+        parts = []
+        try:
+            async for chunk in llm.astream('suggestion', generation.suggestion_prompt(mood)):
+                parts.append(chunk)
+                yield _sse('chunk', {'text': chunk})
+        except llm.LLMError:
+            if saved is not None and not parts:
+                # The replacement failed before any of it was shown: keep the old one
+                yield _sse('chunk', {'text': saved.text})
+                yield _sse('done', {})
+                return
+            llm.fallback('suggestion')
+            yield _sse('error', {'message': "No suggestion available right now."})
+            return
+
+        text = "".join(parts)
+        if text:
+            await Suggestion.objects.aupdate_or_create(mood=mood, defaults={'text': text, 'stale': False})
+        yield _sse('done', {})
+
+    return _sse_response(events())
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_response(events):
+    # Streams chunk by chunk under ASGI; WSGI servers buffer async iterators
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
-    return render(request, 'suggestion.html', {
-        'llm_suggestion': llm_suggestion
-    })
 def login_view(request):
     if request.method == "POST":
         username = request.POST.get("username")
@@ -241,91 +467,99 @@ def journaling_success(request):
     return render(request, "journaling_success.html")
 
 
+@login_required(login_url="/login/")
 def monthly_analysis(request):
+    """Monthly Analysis page - AI reflection on this month's moods"""
     # Get current month moods
+    month_start, month_end = month_bounds()
     moods = Mood.objects.filter(
         user=request.user,
-        created_at__month=timezone.now().month,
-        created_at__year=timezone.now().year
+        created_at__gte=month_start,
+        created_at__lt=month_end
     )
 
-    if not moods.exists():
+    # The daily rollups answer "anything this month?" without touching Mood
+    if not rollups.entries_since(request.user, month=month_start.date())['month']:
         return render(request, 'monthly_analysis.html', {
             'error': "Not enough mood data for this month 🌸"
         })
 
-    mood_text = "\n".join(
-        [f"- {m.mood_type}: {m.note}" for m in moods]
-    )
-
-    # Configure Gemini
-    genai.configure(api_key="")
-    model = genai.GenerativeModel("gemini-2.5-flash")
-
-    prompt = f"""
-You are a gentle and emotionally intelligent mental wellness assistant.
-
-Based on the user's moods for this month below:
-{mood_text}
+    # A saved report for exactly these entries is served as-is, streaming or not
+    saved, content_hash = reports.lookup(request.user, 'monthly_analysis', month_start, month_end)
+    if saved is not None:
+        return render(request, 'monthly_analysis.html', {
+            "analysis": saved
+        })
 
-Respond in the following STRUCTURED FORMAT ONLY:
+    # Streaming mode: send the page shell now, the sections arrive over SSE
+    if settings.LLM_STREAMING_ENABLED:
+        return render(request, 'monthly_analysis.html', {
+            'streaming': True,
+        })
 
-Mood Overview:
-(2–3 lines summarizing overall emotional state)
+    try:
+        # Heavy months are summarized week by week first, to stay within the token budget
+        mood_text = summarize.digest(moods, request.user.username)
+        text = llm.generate('monthly_analysis', generation.monthly_prompt(mood_text))
+    except llm.LLMError:
+        llm.fallback('monthly_analysis')
+        return render(request, 'monthly_analysis.html', {
+            'error': "We couldn't prepare your analysis right now. Please try again soon 🌸"
+        })
 
-Patterns Observed:
-- Pattern 1
-- Pattern 2
-- Pattern 3
+    # ✨ Split response safely
+    sections = generation.parse_monthly_analysis(text)
+    if any(sections.values()):
+        reports.store(request.user, 'monthly_analysis', month_start, content_hash, sections)
 
-Emotional Insight:
-(A deeper reflection about emotional health)
+    return render(request, 'monthly_analysis.html', {
+        "analysis": sections
+    })
 
-Gentle Suggestions:
-- Suggestion 1
-- Suggestion 2
-- Suggestion 3
 
-Tone: warm, supportive, non-judgmental.
-Do NOT add anything outside this structure.
-"""
+@login_required(login_url="/login/")
+async def monthly_analysis_stream(request):
+    """Server-Sent Events feed of monthly analysis sections, parsed as the model writes them"""
+    user = await request.auser()
+    month_start, month_end = month_bounds()
+    moods = [
+        m async for m in Mood.objects.filter(
+            user=user,
+            created_at__gte=month_start,
+            created_at__lt=month_end
+        )
+    ]
 
-    response = model.generate_content(prompt)
-    text = response.text
+    async def events():
+        if not moods:
+            yield _sse('error', {'message': "Not enough mood data for this month 🌸"})
+            return
 
-    # ✨ Split response safely
-    sections = {
-        "overview": "",
-        "patterns": [],
-        "insight": "",
-        "suggestions": []
-    }
+        saved, content_hash = await reports.alookup(user, 'monthly_analysis', month_start, month_end)
+        if saved is not None:
+            for section, value in saved.items():
+                for item in (value if isinstance(value, list) else [value.strip()]):
+                    yield _sse('section', {'section': section, 'value': item})
+            yield _sse('done', {})
+            return
 
-    current = None
-    for line in text.splitlines():
-        line = line.strip()
-
-        if line.startswith("Mood Overview"):
-            current = "overview"
-            continue
-        elif line.startswith("Patterns Observed"):
-            current = "patterns"
-            continue
-        elif line.startswith("Emotional Insight"):
-            current = "insight"
-            continue
-        elif line.startswith("Gentle Suggestions"):
-            current = "suggestions"
-            continue
-
-        if current == "overview":
-            sections["overview"] += line + " "
-        elif current == "patterns" and line.startswith("-"):
-            sections["patterns"].append(line[1:].strip())
-        elif current == "insight":
-            sections["insight"] += line + " "
-        elif current == "suggestions" and line.startswith("-"):
-            sections["suggestions"].append(line[1:].strip())
+        parser = generation.MonthlyAnalysisParser()
+        try:
+            mood_text = await summarize.adigest(moods, user.username)
+            async for chunk in llm.astream('monthly_analysis', generation.monthly_prompt(mood_text)):
+                for section, value in parser.feed(chunk):
+                    yield _sse('section', {'section': section, 'value': value})
+            for section, value in parser.close():
+                yield _sse('section', {'section': section, 'value': value})
+        except llm.LLMError:
+            llm.fallback('monthly_analysis')
+            yield _sse('error', {'message': "We couldn't prepare your analysis right now. Please try again soon 🌸"})
+            return
+        if any(parser.sections.values()):
+            await reports.astore(user, 'monthly_analysis', month_start, content_hash, parser.sections)
+        yield _sse('done', {})
+
+    return _sse_response(events())
 
 
 @login_required(login_url="/login/")
@@ -333,32 +567,20 @@ def wellness_analytics(request):
     """Wellness Analytics page - Shows mood patterns and AI insights"""
     
     # Fetch all moods for the logged-in user in the current month
-    current_month = timezone.now().month
-    current_year = timezone.now().year
+    month_start, month_end = month_bounds()
     
     moods = Mood.objects.filter(
         user=request.user,
-        created_at__month=current_month,
-        created_at__year=current_year
+        created_at__gte=month_start,
+        created_at__lt=month_end
     ).order_by('-created_at')
     
-    # Combine mood_type and note into a single string for AI analysis
-    mood_text = ""
-    if moods.exists():
-        mood_entries = []
-        for mood in moods:
-            entry = f"{mood.mood_type}: {mood.note}"
-            mood_entries.append(entry)
-        mood_text = "\n".join(mood_entries)
-    
-    # Calculate mood distribution with counts
-    mood_distribution = {}
-    for mood in moods:
-        mood_type = mood.mood_type
-        mood_distribution[mood_type] = mood_distribution.get(mood_type, 0) + 1
+    # Mood distribution with counts, read from the daily rollups
+    month_counts = rollups.totals(request.user, start=month_start.date(), end=month_end.date())
+    mood_distribution = rollups.distribution(month_counts)
+    total_moods = month_counts['total']
     
     # Calculate mood distribution percentages
-    total_moods = moods.count()
     mood_percentages = {}
     for mood_type, count in mood_distribution.items():
         percentage = round((count / total_moods * 100)) if total_moods > 0 else 0
@@ -368,28 +590,9 @@ def wellness_analytics(request):
     most_frequent_mood = max(mood_distribution.items(), key=lambda x: x[1])[0] if mood_distribution else "neutral"
     most_frequent_count = mood_distribution.get(most_frequent_mood, 0)
     
-    # Calculate mood streak (consecutive days with mood entries)
-    mood_streak = 0
-    today = timezone.now().date()
-    last_date = None
-    
-    for mood in moods:
-        mood_date = mood.created_at.date()
-        if last_date is None:
-            if mood_date == today:
-                mood_streak += 1
-                last_date = today
-            elif mood_date == today - timedelta(days=1):
-                mood_streak += 1
-                last_date = mood_date
-            else:
-                break
-        else:
-            if mood_date == last_date - timedelta(days=1):
-                mood_streak += 1
-                last_date = mood_date
-            else:
-                break
+    # Mood streak (consecutive days with mood entries, not limited to this month)
+    streak = streaks.for_user(request.user)
+    mood_streak = streak.current
     
     # Calculate emotional balance (positive / neutral / heavy moods)
     positive_moods = ['happy', 'calm']
@@ -427,76 +630,26 @@ def wellness_analytics(request):
     suggestions = fallback_suggestions
     patterns = fallback_patterns
     
-    # Generate AI insights if mood data exists
-    if mood_text:
+    # Generate AI insights if mood data exists (a saved report for the same entries is reused)
+    if total_moods:
         try:
-            genai.configure(api_key="")
-            model = genai.GenerativeModel("gemini-2.5-flash")
+            analysis, content_hash = reports.lookup(request.user, 'wellness_analytics', month_start, month_end)
+            if analysis is None:
+                # Weekly summaries instead once the month outgrows the prompt token budget
+                mood_text = summarize.digest(moods, request.user.username)
+                ai_output = llm.generate('wellness_analytics', generation.wellness_prompt(mood_text)).strip()
+                analysis = generation.parse_wellness_analysis(ai_output)
+                if any(analysis.values()):
+                    reports.store(request.user, 'wellness_analytics', month_start, content_hash, analysis)
             
-            prompt = f"""You are a gentle and emotionally intelligent mental wellness assistant.
-
-Based on the user's mood entries for this month:
-{mood_text}
-
-Provide a comprehensive wellness analysis in the following STRUCTURED FORMAT ONLY:
-
-EMOTIONAL SUMMARY:
-(2-3 lines describing the overall emotional state)
-
-MOOD PATTERNS:
-(2-3 lines about observed patterns in moods)
-
-EMOTIONAL INSIGHT:
-(2-3 lines of deeper reflection about emotional health)
-
-GENTLE SUGGESTIONS:
-(3-4 lines of supportive, actionable suggestions)
-
-Tone: warm, supportive, non-clinical, gentle, encouraging.
-Do NOT include section labels in your output - just provide the content under each section naturally.
-Do NOT add markdown formatting."""
-            
-            response = model.generate_content(prompt)
-            ai_output = response.text.strip()
-            
-            # Parse the structured response into sections
-            lines = ai_output.split('\n')
-            current_section = None
-            sections = {
-                'summary': [],
-                'patterns': [],
-                'insight': [],
-                'suggestions': []
-            }
-            
-            for line in lines:
-                line_lower = line.lower().strip()
-                
-                if 'emotional summary' in line_lower:
-                    current_section = 'summary'
-                    continue
-                elif 'mood patterns' in line_lower:
-                    current_section = 'patterns'
-                    continue
-                elif 'emotional insight' in line_lower:
-                    current_section = 'insight'
-                    continue
-                elif 'gentle suggestions' in line_lower or 'suggestions' in line_lower:
-                    current_section = 'suggestions'
-                    continue
-                
-                if line.strip() and current_section:
-                    sections[current_section].append(line.strip())
-            
-            # Convert sections to strings
-            summary = ' '.join(sections['summary']) if sections['summary'] else fallback_summary
-            patterns = ' '.join(sections['patterns']) if sections['patterns'] else fallback_patterns
-            insight = ' '.join(sections['insight']) if sections['insight'] else fallback_insight
-            suggestions = ' '.join(sections['suggestions']) if sections['suggestions'] else fallback_suggestions
+            summary = analysis['summary'] or fallback_summary
+            patterns = analysis['patterns'] or fallback_patterns
+            insight = analysis['insight'] or fallback_insight
+            suggestions = analysis['suggestions'] or fallback_suggestions
             
         except Exception as e:
             # If AI fails, use fallback data
-            pass
+            llm.fallback('wellness_analytics')
     
     context = {
         'summary': summary,
@@ -509,6 +662,7 @@ Do NOT add markdown formatting."""
         'most_frequent_mood': most_frequent_mood,
         'most_frequent_count': most_frequent_count,
         'mood_streak': mood_streak,
+        'longest_streak': streak.longest,
         'balance_indicator': balance_indicator,
         'balance_emoji': balance_emoji,
         'positive_count': positive_count,
@@ -518,101 +672,35 @@ Do NOT add markdown formatting."""
     
     return render(request, 'wellness_analytics.html', context)
 
-    return render(request, 'monthly_analysis.html', {
-        "analysis": sections
-    })
-
 
 @login_required(login_url="/login/")
 def mindful_challenges(request):
     """Mindful Challenges page - Generates personalized challenges based on recent moods"""
     
-    # Fetch the last 7 moods of the logged-in user
-    recent_moods = Mood.objects.filter(user=request.user).order_by('-created_at')[:7]
-    
-    # Format mood data into a string for AI analysis
-    mood_text = ""
-    if recent_moods.exists():
-        mood_entries = []
-        for mood in recent_moods:
-            entry = f"{mood.mood_type}"
-            mood_entries.append(entry)
-        mood_text = ", ".join(mood_entries)
+    # Last 7 mood types of the logged-in user, formatted for AI analysis
+    mood_text = generation.recent_mood_types(request.user)
     
     # Fallback challenges if AI fails or no mood data
-    fallback_challenges = [
-        {
-            "emoji": "🧘",
-            "title": "5-Minute Meditation",
-            "description": "Start your day with a brief meditation to calm your mind"
-        },
-        {
-            "emoji": "🚶",
-            "title": "Mindful Walk",
-            "description": "Take a slow walk and notice the world around you"
-        },
-        {
-            "emoji": "📓",
-            "title": "Gratitude Journal",
-            "description": "Write three things you're grateful for today"
-        }
-    ]
-    
-    personalized_challenges = fallback_challenges
+    personalized_challenges = FALLBACK_CHALLENGES
     
     # Generate personalized challenges using AI if mood data exists
     if mood_text:
         try:
-            genai.configure(api_key="")
-            model = genai.GenerativeModel("gemini-2.5-flash")
-            
-            prompt = f"""You are a compassionate wellness coach. Based on the user's recent moods ({mood_text}), 
-            generate EXACTLY 3 personalized mindful challenges to help them.
-
-            For EACH challenge, provide ONLY:
-            emoji: (one appropriate emoji)
-            title: (short, 2-3 words)
-            description: (one short, encouraging sentence)
-
-            Format your response EXACTLY like this (3 times):
-            emoji: 🧘
-            title: Challenge Title
-            description: A short encouraging description.
-
-            Generate 3 personalized challenges now, considering their recent emotional state. Keep it simple and supportive."""
-            
-            response = model.generate_content(prompt)
-            ai_output = response.text.strip()
-            
-            # Parse the response into challenge dictionaries
-            challenges = []
-            current_challenge = {}
-            
-            for line in ai_output.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if line.startswith('emoji:'):
-                    if current_challenge:
-                        challenges.append(current_challenge)
-                    current_challenge = {'emoji': line.replace('emoji:', '').strip()}
-                elif line.startswith('title:'):
-                    current_challenge['title'] = line.replace('title:', '').strip()
-                elif line.startswith('description:'):
-                    current_challenge['description'] = line.replace('description:', '').strip()
-            
-            # Add the last challenge
-            if current_challenge and 'emoji' in current_challenge:
-                challenges.append(current_challenge)
+            bundle = generation.daily_bundle(request.user) if settings.LLM_DAILY_BUNDLE_ENABLED else None
+            if bundle:
+                challenges = bundle['challenges']
+            else:
+                challenges = generation.generate_challenges(mood_text)
             
-            # Validate and use AI challenges if we got 3
-            if len(challenges) >= 3:
-                personalized_challenges = challenges[:3]
+            # Use AI challenges only if we got 3 valid ones
+            if challenges:
+                personalized_challenges = challenges
+            else:
+                llm.fallback('challenges')
             
         except Exception as e:
             # If AI fails, use fallback challenges silently
-            pass
+            llm.fallback('challenges')
     
     context = {
         'challenges': personalized_challenges,
@@ -624,38 +712,26 @@ def mindful_challenges(request):
 def wellness_insights(request):
     """Wellness Insights page - Displays horizontal scrolling wellness metrics cards"""
     
-    # Get all moods for the current user
-    all_moods = Mood.objects.filter(user=request.user).order_by('-created_at')
-    
-    # Calculate total moods
-    total_moods = all_moods.count()
+    # Totals per mood type come from the daily rollups, not a scan of every entry
+    mood_counts = rollups.totals(request.user)
+    total_moods = mood_counts['total']
     
     # Get most frequent mood
-    mood_counts = all_moods.values('mood_type').annotate(count=Count('mood_type')).order_by('-count').first()
-    most_frequent_mood = mood_counts['mood_type'] if mood_counts else "N/A"
+    distribution = rollups.distribution(mood_counts)
+    most_frequent_mood = max(distribution, key=distribution.get) if distribution else "N/A"
     
     # Calculate mood streak (consecutive days tracked)
-    mood_streak = 0
-    if total_moods > 0:
-        today = timezone.now().date()
-        check_date = today
-        
-        for i in range(total_moods):
-            mood_date = all_moods[i].created_at.date()
-            if mood_date == check_date:
-                mood_streak += 1
-                check_date -= timedelta(days=1)
-            else:
-                break
+    streak = streaks.for_user(request.user)
+    mood_streak = streak.current
     
     # Calculate emotional balance (positive vs neutral vs heavy)
     positive_moods = ['happy', 'peaceful', 'content', 'excited', 'grateful', 'energetic']
     neutral_moods = ['calm', 'neutral', 'okay', 'balanced']
     heavy_moods = ['sad', 'anxious', 'stressed', 'angry', 'overwhelmed', 'lonely']
     
-    positive_count = all_moods.filter(mood_type__in=positive_moods).count()
-    neutral_count = all_moods.filter(mood_type__in=neutral_moods).count()
-    heavy_count = all_moods.filter(mood_type__in=heavy_moods).count()
+    positive_count = sum(mood_counts.get(mood_type, 0) for mood_type in positive_moods)
+    neutral_count = sum(mood_counts.get(mood_type, 0) for mood_type in neutral_moods)
+    heavy_count = sum(mood_counts.get(mood_type, 0) for mood_type in heavy_moods)
     
     # Determine balance indicator
     if total_moods == 0:
@@ -681,16 +757,15 @@ def wellness_insights(request):
     # Calculate monthly entries
     from datetime import date
     current_month = timezone.now().strftime('%B')
-    current_year = timezone.now().year
-    monthly_entries = all_moods.filter(
-        created_at__year=current_year,
-        created_at__month=timezone.now().month
-    ).count()
+    monthly_entries = rollups.entries_since(
+        request.user, month=timezone.localdate().replace(day=1)
+    )['month']
     
     context = {
         'total_moods': total_moods,
         'most_frequent_mood': most_frequent_mood.capitalize() if most_frequent_mood != "N/A" else "N/A",
         'mood_streak': mood_streak,
+        'longest_streak': streak.longest,
         'balance_indicator': balance_indicator,
         'emotional_insight': emotional_insight,
         'positive_percentage': positive_percentage,
@@ -773,31 +848,16 @@ def personalized_playlist(request):
     
     # Try to generate AI-enhanced recommendations
     try:
-        genai.configure(api_key="")
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        prompt = f"""You are a music recommendation expert. Based on the user's current mood ({recent_mood}), 
-        generate a brief playlist description (2-3 sentences) that explains why these songs would help them feel better.
-        
-        Make it warm, supportive, and encouraging. Focus on the emotional and therapeutic benefits of music.
-        
-        User's note: {recent_note if recent_note else 'No specific note provided'}
-        
-        Generate just the description, no songs list."""
-        
-        response = model.generate_content(prompt)
-        playlist_description = response.text.strip()
+        bundle = generation.daily_bundle(request.user) if settings.LLM_DAILY_BUNDLE_ENABLED else None
+        if bundle:
+            playlist_description = bundle['playlist_description']
+        else:
+            playlist_description = generation.playlist_description(recent_mood, recent_note)
     except:
         # Fallback description
-        mood_descriptions = {
-            'happy': 'Keep the good vibes flowing with uplifting tracks that celebrate joy and positivity.',
-            'calm': 'Soothe your mind with gentle, peaceful music that helps you relax and find inner peace.',
-            'sad': 'Allow yourself to feel and process your emotions with meaningful, reflective songs.',
-            'anxious': 'Find comfort and grounding with music that eases tension and brings stability.',
-            'energetic': 'Amplify your energy with dynamic, uplifting tracks that keep you moving forward.',
-        }
-        playlist_description = mood_descriptions.get(recent_mood.lower(), 
-                                                    'Enjoy music tailored to your emotional needs right now.')
+        llm.fallback('playlist')
+        playlist_description = PLAYLIST_MOOD_DESCRIPTIONS.get(recent_mood.lower(),
+                                                              DEFAULT_PLAYLIST_DESCRIPTION)
     
     context = {
         'playlist': playlist,
@@ -881,9 +941,6 @@ def mood_playlists(request):
     
     # Try to generate AI-powered playlists
     try:
-        genai.configure(api_key="")
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
         prompt = f"""You are a music therapy expert. Based on the user's recent moods ({mood_text}), 
         generate EXACTLY 5 personalized playlists. Each playlist should be tailored to help them emotionally.
 
@@ -905,8 +962,7 @@ def mood_playlists(request):
 
         Generate 5 diverse, mood-appropriate playlists now. Focus on real, well-known songs and artists."""
         
-        response = model.generate_content(prompt)
-        ai_output = response.text.strip()
+        ai_output = llm.generate('mood_playlists', prompt).strip()
         
         # Parse the AI response into playlist dictionaries
         playlists = []
@@ -962,10 +1018,14 @@ def mood_playlists(request):
         # Use AI playlists if we got at least 5 valid ones
         if len(validated_playlists) >= 5:
             playlists = validated_playlists[:5]
+        else:
+            playlists = fallback_playlists
+            llm.fallback('mood_playlists')
         
     except Exception as e:
         # If AI fails, use fallback playlists silently
-        pass
+        playlists = fallback_playlists
+        llm.fallback('mood_playlists')
     
     context = {
         'playlists': playlists,
@@ -979,50 +1039,58 @@ def mood_playlists(request):
 
 @login_required(login_url='/login/')
 def mood_history(request):
-    """Mood History page - Shows user's past mood entries with filtering and pagination"""
+    """Mood History page - Shows user's past mood entries with filtering and cursor pagination"""
     
     # Get all moods for the user
-    moods = Mood.objects.filter(user=request.user).order_by('-created_at')
+    moods = Mood.objects.filter(user=request.user)
     
     # Apply filters
     sort_by = request.GET.get('sort', 'newest')
     mood_filter = request.GET.get('mood', '')
     
-    if sort_by == 'oldest':
-        moods = moods.order_by('created_at')
-    else:
-        moods = moods.order_by('-created_at')
-    
     if mood_filter:
-        moods = moods.filter(mood_type__iexact=mood_filter)
+        # Mood types are stored lowercase; an exact match can use the (user, mood_type, created_at) index
+        moods = moods.filter(mood_type=mood_filter.lower())
     
-    # Calculate statistics
-    total_entries = Mood.objects.filter(user=request.user).count()
+    # Statistics from the daily rollups, in one query:
+    # all-time totals per mood, this month, and the last 7 days (today included)
+    today = timezone.localdate()
+    stats = rollups.summary(request.user, month=today.replace(day=1), week=today - timedelta(days=6))
+    total_entries = stats['total']
     
     # Most common mood
-    most_common_mood = 'N/A'
-    if total_entries > 0:
-        mood_counts = Mood.objects.filter(user=request.user).values('mood_type').annotate(count=Count('id')).order_by('-count')
-        if mood_counts.exists():
-            most_common_mood = mood_counts[0]['mood_type']
+    distribution = rollups.distribution(stats)
+    most_common_mood = max(distribution, key=distribution.get) if distribution else 'N/A'
     
-    # Entries this month
-    current_month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    month_entries = Mood.objects.filter(user=request.user, created_at__gte=current_month_start).count()
+    month_entries = stats['month']
     
     # Average entries per week
-    seven_days_ago = timezone.now() - timedelta(days=7)
-    week_entries = Mood.objects.filter(user=request.user, created_at__gte=seven_days_ago).count()
-    avg_per_week = week_entries
+    avg_per_week = stats['week']
+    
+    # Keyset pagination - 20 entries per page, one query however deep the page
+    page_obj = paginate(
+        moods, 20,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        descending=sort_by != 'oldest',
+    )
     
-    # Pagination - 20 entries per page
-    paginator = Paginator(moods, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Page links keep the current sort and mood filter
+    params = request.GET.copy()
+    for key in ('after', 'before', 'page'):
+        params.pop(key, None)
+    
+    def page_url(**cursor):
+        query = params.copy()
+        query.update(cursor)
+        return f"?{query.urlencode()}"
     
     context = {
         'moods': page_obj.object_list,
         'page_obj': page_obj,
+        'next_page_url': page_url(after=page_obj.next_cursor) if page_obj.has_next else None,
+        'previous_page_url': page_url(before=page_obj.previous_cursor) if page_obj.has_previous else None,
+        'first_page_url': page_url(),
         'total_entries': total_entries,
         'most_common_mood': most_common_mood,
         'month_entries': month_entries,
@@ -1032,4 +1100,76 @@ def mood_history(request):
         'current_mood_filter': mood_filter,
     }
     
-    return render(request, 'mood_history.html', context)
\ No newline at end of file
+    return render(request, 'mood_history.html', context)
+
+
+@login_required(login_url='/login/')
+def mood_stats_api(request):
+    """Mood stats API - JSON mood counts per day/week/month over a date range, for the charts"""
+    bucket = request.GET.get('bucket', 'day')
+    if bucket not in rollups.BUCKETS:
+        return JsonResponse({'error': f"bucket must be one of: {', '.join(rollups.BUCKETS)}"}, status=400)
+    
+    # ?start=YYYY-MM-DD&end=YYYY-MM-DD (both inclusive), defaulting to the last STATS_DEFAULT_DAYS days
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = (date.fromisoformat(request.GET['start']) if request.GET.get('start')
+                 else end - timedelta(days=settings.STATS_DEFAULT_DAYS - 1))
+        max_points = int(request.GET.get('max_points', settings.STATS_MAX_POINTS))
+    except (ValueError, OverflowError):
+        return JsonResponse({'error': "start/end must be YYYY-MM-DD and max_points a number"}, status=400)
+    if start > end:
+        return JsonResponse({'error': "start must not be after end"}, status=400)
+    # The range is read up to the day after end, which must exist
+    if end >= date.max:
+        return JsonResponse({'error': f"end must be before {date.max.isoformat()}"}, status=400)
+    if (end - start).days >= settings.STATS_MAX_DAYS:
+        return JsonResponse({'error': f"the range may span at most {settings.STATS_MAX_DAYS} days"}, status=400)
+    max_points = min(max(max_points, 3), settings.STATS_MAX_POINTS)
+    
+    points = rollups.bucketed(request.user, start, end + timedelta(days=1), bucket)
+    
+    # Multi-year ranges: keep the points that preserve the shape of the total curve
+    downsampled = len(points) > max_points
+    if downsampled:
+        keep = lttb([(p['period'].toordinal(), p['total']) for p in points], max_points)
+        points = [points[i] for i in keep]
+    
+    response = JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'bucket': bucket,
+        'downsampled': downsampled,
+        'mood_types': rollups.MOOD_TYPES,
+        'points': [{**p, 'period': p['period'].isoformat()} for p in points],
+    })
+    
+    # Charts re-request the same range often; an unchanged answer goes back as 304
+    response['ETag'] = quote_etag(hashlib.md5(response.content).hexdigest())
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(request, etag=response['ETag'], response=response)
+
+
+@staff_member_required
+def llm_status(request):
+    """LLM monitoring endpoint - circuit breaker state, cache and coalescing counters as JSON (staff only)"""
+    gateway = llm.get_gateway()
+    return JsonResponse({
+        'provider': gateway.provider.name,
+        'breaker': gateway.breaker.stats(),
+        'cache': llm_cache.get_cache().stats(),
+        'singleflight': gateway.singleflight.stats(),
+    })
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for `Authorization: Bearer <METRICS_BEARER_TOKEN>` or a staff session"""
+    if not request.user.is_staff:
+        token = settings.METRICS_BEARER_TOKEN
+        # No token configured: don't even reveal that the endpoint exists
+        if not token:
+            return HttpResponse(status=404)
+        given = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+            return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(metrics.render(metrics.gather()), content_type=metrics.CONTENT_TYPE)
@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the other middleware too
+    'myapp.instrumentation.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +57,8 @@ ROOT_URLCONF = 'myproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, with render time counted by RequestTimingMiddleware
+        'BACKEND': 'myapp.instrumentation.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR,'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,6 +81,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent writers
+            # queue up (for up to `timeout` seconds) instead of failing with
+            # "database is locked" when a read would have to become a write
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -123,3 +133,167 @@ STATICFILES_DIRS = [
 ]
 
 LOGIN_URL = '/login/'
+
+
+# Gemini / LLM gateway (see myapp/llm.py)
+
+# Model backend: 'gemini', 'fake' (local, no network; see myapp/providers.py)
+# or a dotted path to a Provider subclass
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'gemini')
+
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.5-flash')
+
+# Seconds a single LLM call may take, including the wait for a free slot
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', '15'))
+
+# Maximum number of LLM calls in flight per process
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '4'))
+
+# Serve wisdom, mindful challenges and the playlist description from one combined
+# JSON call per user per day (see generation.daily_bundle)
+LLM_DAILY_BUNDLE_ENABLED = os.environ.get('LLM_DAILY_BUNDLE_ENABLED', '1') == '1'
+
+# Per-feature latency budgets (seconds). When one runs out the view renders its
+# fallback; features not listed use LLM_TIMEOUT
+LLM_LATENCY_BUDGETS = {
+    'wisdom': 4,
+    'playlist': 4,
+    'challenges': 6,
+    'mood_playlists': 8,
+    'suggestion': 10,
+    'monthly_analysis': 20,
+    'wellness_analytics': 20,
+    # Wisdom, challenges and the playlist page wait on it: keep it within their smallest budget
+    'daily_bundle': 4,
+    'week_summary': 10,
+}
+
+# Fake provider: response latency per feature ('default' for the rest). Distributions:
+# fixed (seconds), uniform (low, high), normal (mean, stddev), lognormal (median, sigma)
+LLM_FAKE_LATENCY = {
+    'default': {'distribution': 'lognormal', 'median': 0.8, 'sigma': 0.5},
+    'wisdom': {'distribution': 'lognormal', 'median': 0.6, 'sigma': 0.4},
+    'monthly_analysis': {'distribution': 'lognormal', 'median': 4.0, 'sigma': 0.6},
+    'wellness_analytics': {'distribution': 'lognormal', 'median': 4.0, 'sigma': 0.6},
+    'mood_playlists': {'distribution': 'lognormal', 'median': 2.5, 'sigma': 0.5},
+}
+
+# Share of fake calls that fail (0.0 - 1.0)
+LLM_FAKE_ERROR_RATE = float(os.environ.get('LLM_FAKE_ERROR_RATE', '0'))
+
+LLM_FAKE_SEED = int(os.environ.get('LLM_FAKE_SEED', '0'))
+
+# Multiplies every fake latency, e.g. 0 for instant answers in CI
+LLM_FAKE_LATENCY_SCALE = float(os.environ.get('LLM_FAKE_LATENCY_SCALE', '1'))
+
+# Above this many (estimated) tokens of entries, the monthly prompts are built
+# from per-week summaries instead of the raw notes (see myapp/summarize.py)
+LLM_PROMPT_TOKEN_BUDGET = 3000
+
+# Open the circuit after this many consecutive failures, then probe again after N seconds
+LLM_BREAKER_FAILURE_THRESHOLD = 5
+
+LLM_BREAKER_RESET_SECONDS = 30
+
+# Stream suggestion and monthly analysis text to the browser over Server-Sent
+# Events. Needs an ASGI server (myproject/asgi.py); WSGI buffers the stream.
+LLM_STREAMING_ENABLED = os.environ.get('LLM_STREAMING_ENABLED', '0') == '1'
+
+# Cache for generated LLM text (see myapp/llm_cache.py)
+LLM_CACHE_MAX_ENTRIES = 2048
+
+LLM_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Seconds each feature's answers stay fresh
+LLM_CACHE_TTLS = {
+    'wisdom': 6 * 60 * 60,
+    'playlist': 6 * 60 * 60,
+    'challenges': 6 * 60 * 60,
+    'daily_bundle': 24 * 60 * 60,
+    # Keyed by a hash of the week's entries, so only a changed week is redone
+    'week_summary': 35 * 24 * 60 * 60,
+}
+
+LLM_CACHE_DEFAULT_TTL = 60 * 60
+
+# Optional on-disk tier that survives restarts, e.g. BASE_DIR / 'var' / 'llm_cache'
+LLM_CACHE_DIR = os.environ.get('LLM_CACHE_DIR') or None
+
+
+# Background generation queue (see myapp/jobs.py and `manage.py run_generation_worker`).
+# Off by default: without a worker running, the suggestion page would wait out
+# GENERATION_JOB_STALE_SECONDS before generating inline
+GENERATION_QUEUE_ENABLED = os.environ.get('GENERATION_QUEUE_ENABLED', '0') == '1'
+
+# Work queued when a mood is saved. 'playlist' and 'challenges' only warm the
+# LLM cache, so they help the views only when LLM_CACHE_DIR is shared with the worker
+GENERATION_JOB_KINDS = ['suggestion']
+
+GENERATION_JOB_MAX_ATTEMPTS = 3
+
+# A failed job waits this long before its next attempt, doubling after each failure
+GENERATION_JOB_RETRY_SECONDS = 10
+
+# Queued jobs nobody picked up within this many seconds are generated inline by
+# the view, and 'running' jobs this old are requeued by the worker
+GENERATION_JOB_STALE_SECONDS = 120
+
+
+# Mood stats API (/api/mood-stats/): most points a response may carry;
+# longer series are downsampled with LTTB (see myapp/downsample.py)
+STATS_MAX_POINTS = 400
+
+# Range returned when the client doesn't ask for one
+STATS_DEFAULT_DAYS = 365
+
+# Longest range (in days) a client may ask for
+STATS_MAX_DAYS = 20 * 366
+
+# Recent entries shown on the mood entry page per load (more load on scroll)
+MOOD_ENTRY_PAGE_SIZE = 10
+
+# Per-request timing (see myapp/instrumentation.py): a Server-Timing header with
+# SQL / LLM / template time and a JSON line on the 'myapp.timing' logger.
+# Off by default; set REQUEST_TIMING_ENABLED=1 to turn it on
+REQUEST_TIMING_ENABLED = os.environ.get('REQUEST_TIMING_ENABLED', '0') == '1'
+
+# Share of requests timed when enabled (0.0 - 1.0)
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '0.01'))
+
+# Timed requests running more SQL queries than this are logged as warnings
+REQUEST_QUERY_BUDGET = 20
+
+# Per-route budgets by URL name; None turns the check off for a route
+REQUEST_QUERY_BUDGETS = {}
+
+# Prometheus metrics at /metrics (see myapp/metrics.py). With several worker
+# processes, point METRICS_DIR at a directory they all share and each one
+# writes its numbers there every METRICS_FLUSH_SECONDS for /metrics to add up
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '5'))
+
+# Scrapers must send "Authorization: Bearer <token>". Unset, /metrics answers
+# only logged-in staff (404 for everyone else)
+METRICS_BEARER_TOKEN = os.environ.get('METRICS_BEARER_TOKEN', '')
+
+# Append-only JSON-lines ledger of LLM calls, cache hits and fallbacks (see
+# myapp/ledger.py and `manage.py llm_ledger_report`); empty turns it off
+LLM_LEDGER_PATH = os.environ.get('LLM_LEDGER_PATH', str(BASE_DIR / 'var' / 'llm_ledger.jsonl'))
+
+# The buffer is written out this often; past LLM_LEDGER_BUFFER unwritten
+# records the oldest are dropped rather than making requests wait
+LLM_LEDGER_FLUSH_SECONDS = float(os.environ.get('LLM_LEDGER_FLUSH_SECONDS', '2'))
+LLM_LEDGER_BUFFER = 10000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'myapp.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}